@@ -1,40 +1,205 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, g, abort
+from flask import before_render_template, template_rendered, stream_template, stream_with_context, get_flashed_messages
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
 import os
 from datetime import datetime, timedelta
 
 import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from decimal import Decimal
+import atexit
+import base64
+import click
+import collections
+import contextvars
+import copy
+import hashlib
+import hmac
+import gzip
+import heapq
+import itertools
+import json
+import mimetypes
+import random
+import re
+import secrets
+import sys
+import sqlite3
+import stat
+import threading
+import time
 import uuid
 import logging
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from itsdangerous import BadSignature, Signer
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.datastructures import CallbackDict
+from werkzeug.http import parse_accept_header
+from werkzeug.security import check_password_hash, generate_password_hash, safe_join
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzip-compressed.
+    brotli = None
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
 
 # --- AWS Configuration ---
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Session cookies are signed with SECRET_KEY, which every worker and host must share. To rotate
+# it, set the new key and move the old one into SECRET_KEY_FALLBACKS (comma-separated): cookies
+# signed with a fallback key are still accepted, new ones are signed with SECRET_KEY.
+app.secret_key = os.environ.get('SECRET_KEY')
+app.config['SECRET_KEY_FALLBACKS'] = [
+    key.strip() for key in os.environ.get('SECRET_KEY_FALLBACKS', '').split(',') if key.strip()
+]
+if not app.secret_key:
+    app.secret_key = os.urandom(24)
+    logger.warning(
+        "SECRET_KEY is not set; using a random key. Sessions will not survive a restart or be "
+        "shared between workers."
+    )
+
 # AWS Region (best practice: use environment variables or IAM roles on EC2)
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1') # e.g., 'us-east-1', 'ap-south-1'
 
+# Where application data lives: 'dynamodb' (default), 'sqlite' (single host, no AWS needed)
+# or 'memory' (local runs and load tests; data is lost on restart).
+STORAGE_BACKEND = os.environ.get('MEDTRACK_STORAGE', 'dynamodb')
+SQLITE_PATH = os.environ.get('MEDTRACK_SQLITE_PATH', 'medtrack.db')
+
+# Table names and the primary key of each table.
+USERS_TABLE = 'medtrack_users'
+APPOINTMENTS_TABLE = 'medtrack_appointments'
+PRESCRIPTIONS_TABLE = 'medtrack_prescriptions'
+MEDICATION_REMINDERS_TABLE = 'medtrack_medication_reminders'
+TABLE_KEYS = {
+    USERS_TABLE: 'email',
+    APPOINTMENTS_TABLE: 'appointment_id',
+    PRESCRIPTIONS_TABLE: 'prescription_id',
+    MEDICATION_REMINDERS_TABLE: 'reminder_id',
+}
+
+# Connection pool, timeout and retry settings for every AWS client. Size the pool to at least the
+# number of threads that call AWS at once (WSGI threads plus the background workers).
+# Within a web request an attempt (first try or retry) only starts if AWS_CONNECT_TIMEOUT +
+# AWS_READ_TIMEOUT still fit in REQUEST_DEADLINE_SECONDS, so keep their sum well below it.
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '50'))
+AWS_CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', '1'))
+AWS_READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', '2'))
+AWS_RETRY_MODE = os.environ.get('AWS_RETRY_MODE', 'adaptive')  # 'adaptive', 'standard' or 'legacy'
+AWS_MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '3'))
+AWS_TCP_KEEPALIVE = os.environ.get('AWS_TCP_KEEPALIVE', 'true').lower() in ('1', 'true', 'yes')
+
+
+# --- AWS client factory ---
+# Builds every boto3 client and resource from one botocore Config and hands out a single shared
+# instance per service. botocore clients are thread-safe; the DynamoDB resource is shared only for
+# its Table actions, which are stateless calls on that same client.
+# HTTP requests in flight per service are tracked through botocore events so /metrics can show
+# how close each connection pool is to saturation.
+class AWSClientFactory:
+    def __init__(self, region_name, max_pool_connections, connect_timeout, read_timeout,
+                 retry_mode, max_attempts, tcp_keepalive):
+        self.config = Config(
+            region_name=region_name,
+            max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={'mode': retry_mode, 'total_max_attempts': max_attempts},
+            tcp_keepalive=tcp_keepalive
+        )
+        self._session = boto3.session.Session(region_name=region_name)
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._resources = {}
+        self._pool_stats = {}
+
+    def client(self, service_name):
+        with self._lock:
+            if service_name not in self._clients:
+                client = self._session.client(service_name, config=self.config)
+                self._instrument(service_name, client)
+                self._clients[service_name] = client
+            return self._clients[service_name]
+
+    def resource(self, service_name):
+        with self._lock:
+            if service_name not in self._resources:
+                resource = self._session.resource(service_name, config=self.config)
+                self._instrument(service_name, resource.meta.client)
+                self._resources[service_name] = resource
+            return self._resources[service_name]
+
+    def stats(self):
+        with self._lock:
+            return {
+                service_name: dict(
+                    pool_stats,
+                    pool_size=self.config.max_pool_connections,
+                    utilization=round(pool_stats['in_flight'] / self.config.max_pool_connections, 3),
+                )
+                for service_name, pool_stats in self._pool_stats.items()
+            }
+
+    def _instrument(self, service_name, client):
+        self._pool_stats[service_name] = {'in_flight': 0, 'peak_in_flight': 0, 'requests': 0, 'saturated_requests': 0}
+        client.meta.events.register('before-send', partial(self._on_send, service_name))
+        # After _on_send: botocore still emits response-received when this raises, so the pool
+        # counts stay balanced.
+        client.meta.events.register('before-send', self._check_deadline)
+        client.meta.events.register('response-received', partial(self._on_response, service_name))
+
+    def _check_deadline(self, **kwargs):
+        # Runs before every attempt, retries included: one that could outlast the request's
+        # deadline is not started.
+        budget = remaining_budget()
+        if budget is not None and budget < self.config.connect_timeout + self.config.read_timeout:
+            raise DeadlineExceeded(f"Request deadline leaves {max(0.0, budget):.2f}s, too little for another AWS attempt")
+
+    def _on_send(self, service_name, **kwargs):
+        with self._lock:
+            pool_stats = self._pool_stats[service_name]
+            pool_stats['requests'] += 1
+            if pool_stats['in_flight'] >= self.config.max_pool_connections:
+                pool_stats['saturated_requests'] += 1
+            pool_stats['in_flight'] += 1
+            pool_stats['peak_in_flight'] = max(pool_stats['peak_in_flight'], pool_stats['in_flight'])
+
+    def _on_response(self, service_name, **kwargs):
+        with self._lock:
+            self._pool_stats[service_name]['in_flight'] -= 1
+
+
+aws_clients = AWSClientFactory(
+    region_name=AWS_REGION,
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    connect_timeout=AWS_CONNECT_TIMEOUT,
+    read_timeout=AWS_READ_TIMEOUT,
+    retry_mode=AWS_RETRY_MODE,
+    max_attempts=AWS_MAX_ATTEMPTS,
+    tcp_keepalive=AWS_TCP_KEEPALIVE
+)
+
 # Initialize Boto3 clients and resources for DynamoDB and SNS.
 # When running on an EC2 instance with an associated IAM Role, boto3 will automatically pick up credentials from the instance metadata.
 # Therefore, you do NOT need to provide aws_access_key_id or aws_secret_access_key here.
 try:
-    dynamodb = boto3.resource(
-        'dynamodb',
-        region_name=AWS_REGION
-    )
-    sns_client = boto3.client(
-        'sns',
-        region_name=AWS_REGION
-    )
+    dynamodb = aws_clients.resource('dynamodb')
+    sns_client = aws_clients.client('sns')
 
     # Define DynamoDB table objects.
-    
-    USERS_TABLE = dynamodb.Table('medtrack_users')
-    APPOINTMENTS_TABLE = dynamodb.Table('medtrack_appointments')
-    PRESCRIPTIONS_TABLE = dynamodb.Table('medtrack_prescriptions')
-    MEDICATION_REMINDERS_TABLE = dynamodb.Table('medtrack_medication_reminders')
+    TABLES = {table_name: dynamodb.Table(table_name) for table_name in TABLE_KEYS}
     logger.info("Boto3 clients and DynamoDB tables initialized successfully, assuming IAM Role credentials.")
 except Exception as e:
     logger.error(f"FATAL ERROR: Failed to initialize Boto3 clients or access DynamoDB tables. "
@@ -47,6 +212,2171 @@ except Exception as e:
 # Subscribe emails/phone numbers to this topic to receive notifications.
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:418272775181:Medtrack:911baee0-b2d6-4c3d-b735-a29a602727f1') # REPLACE WITH YOUR ACTUAL SNS TOPIC ARN
 
+# DynamoDB reads are paged: DYNAMODB_PAGE_SIZE bounds how many items one response holds in memory.
+DYNAMODB_PAGE_SIZE = int(os.environ.get('DYNAMODB_PAGE_SIZE', '100'))
+# Rows per page of the paginated dashboard lists (appointments, prescriptions and reminders).
+DASHBOARD_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', '20'))
+# Streamed pages are sent in chunks of about this many characters rather than one per template
+# statement, so every write (and every compressor flush) carries a useful amount of HTML.
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', '8192'))
+
+# How long (in seconds) the cached doctor directory is served before it is re-read.
+DOCTOR_DIRECTORY_TTL = float(os.environ.get('DOCTOR_DIRECTORY_TTL', '300'))
+
+# Items per page of the JSON API lists, unless the client asks for up to API_MAX_PAGE_SIZE with ?limit=.
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '100'))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '1000'))
+
+# Defaults for maintenance jobs that read whole tables with a parallel scan.
+PARALLEL_SCAN_SEGMENTS = int(os.environ.get('PARALLEL_SCAN_SEGMENTS', '8'))
+REMINDER_ROLLOVER_SEGMENTS = int(os.environ.get('REMINDER_ROLLOVER_SEGMENTS', str(PARALLEL_SCAN_SEGMENTS)))
+
+# SNS notifications are written to a local outbox log and published by background workers.
+# NOTIFICATION_QUEUE_SIZE caps the undelivered backlog; NOTIFICATION_DRAIN_TIMEOUT bounds the
+# flush at shutdown. Retry delays grow from NOTIFICATION_RETRY_BASE_SECONDS up to
+# NOTIFICATION_RETRY_MAX_SECONDS; delivered events are kept NOTIFICATION_RETENTION_SECONDS for dedupe.
+NOTIFICATION_OUTBOX_PATH = os.environ.get('NOTIFICATION_OUTBOX_PATH', 'medtrack_outbox.db')
+NOTIFICATION_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_QUEUE_SIZE', '100000'))
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', '4'))
+NOTIFICATION_DRAIN_TIMEOUT = float(os.environ.get('NOTIFICATION_DRAIN_TIMEOUT', '10'))
+NOTIFICATION_LEASE_SECONDS = float(os.environ.get('NOTIFICATION_LEASE_SECONDS', '60'))
+NOTIFICATION_RETRY_BASE_SECONDS = float(os.environ.get('NOTIFICATION_RETRY_BASE_SECONDS', '1'))
+NOTIFICATION_RETRY_MAX_SECONDS = float(os.environ.get('NOTIFICATION_RETRY_MAX_SECONDS', '300'))
+NOTIFICATION_POLL_SECONDS = float(os.environ.get('NOTIFICATION_POLL_SECONDS', '1'))
+NOTIFICATION_RETENTION_SECONDS = float(os.environ.get('NOTIFICATION_RETENTION_SECONDS', '86400'))
+# Events go out in SNS PublishBatch calls of up to NOTIFICATION_BATCH_SIZE (max 10) entries. A worker
+# that finds a partial batch waits NOTIFICATION_LINGER_SECONDS for more events before sending it.
+NOTIFICATION_BATCH_SIZE = min(10, int(os.environ.get('NOTIFICATION_BATCH_SIZE', '10')))
+NOTIFICATION_LINGER_SECONDS = float(os.environ.get('NOTIFICATION_LINGER_SECONDS', '0.05'))
+# Non-urgent notifications for the same recipient are held for up to NOTIFICATION_DIGEST_WINDOW_SECONDS
+# and sent as one digest of at most NOTIFICATION_DIGEST_MAX_EVENTS events. 0 disables digests.
+NOTIFICATION_DIGEST_WINDOW_SECONDS = float(os.environ.get('NOTIFICATION_DIGEST_WINDOW_SECONDS', '300'))
+NOTIFICATION_DIGEST_MAX_EVENTS = int(os.environ.get('NOTIFICATION_DIGEST_MAX_EVENTS', '50'))
+
+# Run the medication dose dispatcher inside the web process. Enable it on one process only, or run
+# `flask reminder-scheduler` as a separate service on the same host as the web workers. The web
+# workers append created and deleted reminders to the change log at REMINDER_CHANGE_LOG_PATH, which
+# the scheduler polls every REMINDER_CHANGES_POLL_SECONDS; the full reload every
+# REMINDER_SCHEDULER_RELOAD_SECONDS only picks up changes made on other hosts.
+REMINDER_SCHEDULER_ENABLED = os.environ.get('REMINDER_SCHEDULER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+REMINDER_SCHEDULER_RELOAD_SECONDS = float(os.environ.get('REMINDER_SCHEDULER_RELOAD_SECONDS', '86400'))
+REMINDER_CHANGE_LOG_PATH = os.environ.get('REMINDER_CHANGE_LOG_PATH', 'medtrack_reminder_changes.db')
+REMINDER_CHANGES_POLL_SECONDS = float(os.environ.get('REMINDER_CHANGES_POLL_SECONDS', '5'))
+# Doses due together (say, everyone's 08:00) are rechecked with one batched read and queued in one
+# outbox transaction, up to REMINDER_DISPATCH_BATCH_SIZE at a time.
+REMINDER_DISPATCH_BATCH_SIZE = int(os.environ.get('REMINDER_DISPATCH_BATCH_SIZE', '100'))
+
+# Each DynamoDB table and the SNS topic has its own circuit breaker. CIRCUIT_FAILURE_THRESHOLD
+# consecutive failures open it; after CIRCUIT_RESET_SECONDS one probe call is let through.
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_SECONDS = float(os.environ.get('CIRCUIT_RESET_SECONDS', '30'))
+# Total time (in seconds) a web request may spend on downstream calls; 0 disables the budget.
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', '8'))
+
+# Responses of at least COMPRESSION_MIN_SIZE bytes are compressed with brotli (when installed) or
+# gzip for clients that accept it. Static files are served from the .br/.gz copies written by
+# `flask compress-static` instead of being compressed per request.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '500'))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# Compiled templates are cached as bytecode, shared by every worker on the host. By default Jinja's
+# own per-user directory is used; JINJA_BYTECODE_CACHE_DIR names another one, which must be owned by
+# this user with mode 0700 since the cached bytecode is executed (empty disables the cache).
+# TEMPLATE_WARMUP compiles all templates when the app is created.
+JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', 'true').lower() in ('1', 'true', 'yes')
+
+# Live dashboard updates over server-sent events, off by default: every open dashboard holds a
+# stream, which under a thread-per-request server ties up a thread (with sync gunicorn workers, a
+# whole worker) for as long as the page is open. Enable them with a cooperative server, where an
+# idle stream only costs a greenlet, e.g. `gunicorn -k gevent --worker-connections 5000 app:app`
+# (requires gevent). SSE_MAX_CONNECTIONS caps streams per process there; any other server gets at
+# most SSE_THREADED_MAX_CONNECTIONS, which must stay well below its threads per process so ordinary
+# requests always find one free. Each connection buffers at most SSE_QUEUE_SIZE undelivered events
+# and a comment is sent every SSE_KEEPALIVE_SECONDS so proxies keep idle streams open.
+LIVE_UPDATES_ENABLED = os.environ.get('LIVE_UPDATES_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE', '32'))
+SSE_MAX_CONNECTIONS = int(os.environ.get('SSE_MAX_CONNECTIONS', '5000'))
+SSE_THREADED_MAX_CONNECTIONS = int(os.environ.get('SSE_THREADED_MAX_CONNECTIONS', '4'))
+SSE_KEEPALIVE_SECONDS = float(os.environ.get('SSE_KEEPALIVE_SECONDS', '25'))
+
+# Where session data is kept: 'cookie' (default; Flask's signed cookie), 'memory' (one process) or
+# 'sqlite' (shared by the workers on one host through SESSION_SQLITE_PATH). The server-side stores
+# keep up to SESSION_CACHE_SIZE sessions in memory and expire those unused for SESSION_TTL_SECONDS;
+# expired sessions are swept every SESSION_SWEEP_SECONDS.
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cookie')
+SESSION_SQLITE_PATH = os.environ.get('SESSION_SQLITE_PATH', 'medtrack_sessions.db')
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', '10000'))
+SESSION_TTL_SECONDS = float(os.environ.get('SESSION_TTL_SECONDS', '86400'))
+SESSION_SWEEP_SECONDS = float(os.environ.get('SESSION_SWEEP_SECONDS', '300'))
+
+# Passwords are stored as salted PBKDF2-SHA256 hashes. At startup the iteration count is calibrated
+# so one hash takes about PASSWORD_HASH_TARGET_SECONDS on this host (hosts fast enough to do more
+# than the floor in that time get more iterations), but never fewer than
+# PASSWORD_HASH_MIN_ITERATIONS (600000, the OWASP recommendation for PBKDF2-SHA256); set
+# PASSWORD_HASH_ITERATIONS to skip the calibration, e.g. in tests. Hashing runs
+# on PASSWORD_HASH_WORKERS threads, with at most PASSWORD_HASH_MAX_PENDING hashes queued or running.
+PASSWORD_HASH_TARGET_SECONDS = float(os.environ.get('PASSWORD_HASH_TARGET_SECONDS', '0.5'))
+PASSWORD_HASH_MIN_ITERATIONS = int(os.environ.get('PASSWORD_HASH_MIN_ITERATIONS', '600000'))
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', '0'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64'))
+
+# --- DynamoDB secondary indexes ---
+# The dashboards read one user's records at a time, so every per-user read goes through a
+# global secondary index instead of scanning the whole table.
+PATIENT_APPOINTMENTS_INDEX = 'patient_email-date-index'
+PATIENT_APPOINTMENTS_STATUS_INDEX = 'patient_email-status-index'
+PATIENT_REMINDERS_INDEX = 'patient_email-date-index'
+PATIENT_PRESCRIPTIONS_INDEX = 'patient_email-date_prescribed-index'
+DOCTOR_APPOINTMENTS_INDEX = 'doctor_email-date-index'
+DOCTOR_APPOINTMENTS_STATUS_INDEX = 'doctor_email-status-index'
+DOCTOR_PRESCRIPTIONS_INDEX = 'doctor_email-date_prescribed-index'
+USER_TYPE_INDEX = 'user_type-index'
+
+# table name -> [(index name, partition key, sort key or None)]
+TABLE_INDEXES = {
+    APPOINTMENTS_TABLE: [
+        (PATIENT_APPOINTMENTS_INDEX, 'patient_email', 'date'),
+        (DOCTOR_APPOINTMENTS_INDEX, 'doctor_email', 'date'),
+        (PATIENT_APPOINTMENTS_STATUS_INDEX, 'patient_email', 'status'),
+        (DOCTOR_APPOINTMENTS_STATUS_INDEX, 'doctor_email', 'status'),
+    ],
+    MEDICATION_REMINDERS_TABLE: [(PATIENT_REMINDERS_INDEX, 'patient_email', 'date')],
+    PRESCRIPTIONS_TABLE: [
+        (PATIENT_PRESCRIPTIONS_INDEX, 'patient_email', 'date_prescribed'),
+        (DOCTOR_PRESCRIPTIONS_INDEX, 'doctor_email', 'date_prescribed'),
+    ],
+    USERS_TABLE: [(USER_TYPE_INDEX, 'user_type', None)],
+}
+
+
+def find_index(table_name, field, sort_key=None):
+    # Returns (index name, partition key, sort key) of the index on `field` in `table_name`, sorted
+    # by `sort_key` when given and otherwise the first one listed.
+    for index in TABLE_INDEXES.get(table_name, []):
+        if index[1] == field and (sort_key is None or index[2] == sort_key):
+            return index
+    raise KeyError(f"{table_name} has no index on {field}" + (f" sorted by {sort_key}" if sort_key else ""))
+
+
+def page_cursor(table_name, index, item):
+    # The position just after `item` in `index`: its table key plus its index keys, which is also
+    # the shape DynamoDB expects as ExclusiveStartKey for an index query.
+    return {name: item[name] for name in (TABLE_KEYS[table_name], index[1], index[2])}
+
+
+def check_page_cursor(table_name, index, value, cursor):
+    # Cursors come back from clients, so one may only continue a query on the same partition.
+    expected = {TABLE_KEYS[table_name], index[1], index[2]}
+    if (not isinstance(cursor, dict) or set(cursor) != expected or cursor[index[1]] != value
+            or not all(isinstance(part, str) for part in cursor.values())):
+        raise ValueError("Invalid page cursor")
+
+
+class PageReader:
+    # One page of query results, read lazily as the caller iterates. The query reads one item
+    # past the page, which tells whether there is a next page; next_cursor is set once that
+    # item has been reached, so it is only meaningful after iteration.
+    def __init__(self, items, table_name, index, limit):
+        self._items = items
+        self._table_name = table_name
+        self._index = index
+        self._limit = limit
+        self.next_cursor = None
+
+    def __iter__(self):
+        last = None
+        for count, item in enumerate(self._items):
+            if count == self._limit:
+                self.next_cursor = page_cursor(self._table_name, self._index, last)
+                return
+            last = item
+            yield item
+
+
+def create_missing_indexes(wait=True):
+    # Creates every index in TABLE_INDEXES that does not exist yet. DynamoDB only accepts one
+    # index creation per UpdateTable call, so each index is waited on before the next one.
+    client = dynamodb.meta.client
+    created = []
+    for table_name, indexes in TABLE_INDEXES.items():
+        for index_name, hash_key, range_key in indexes:
+            description = client.describe_table(TableName=table_name)['Table']
+            existing = {gsi['IndexName'] for gsi in description.get('GlobalSecondaryIndexes', [])}
+            if index_name in existing:
+                continue
+
+            key_schema = [{'AttributeName': hash_key, 'KeyType': 'HASH'}]
+            attribute_definitions = [{'AttributeName': hash_key, 'AttributeType': 'S'}]
+            if range_key:
+                key_schema.append({'AttributeName': range_key, 'KeyType': 'RANGE'})
+                attribute_definitions.append({'AttributeName': range_key, 'AttributeType': 'S'})
+
+            index = {
+                'IndexName': index_name,
+                'KeySchema': key_schema,
+                'Projection': {'ProjectionType': 'ALL'},
+            }
+            billing_mode = description.get('BillingModeSummary', {}).get('BillingMode', 'PROVISIONED')
+            if billing_mode == 'PROVISIONED':
+                throughput = description['ProvisionedThroughput']
+                index['ProvisionedThroughput'] = {
+                    'ReadCapacityUnits': throughput['ReadCapacityUnits'],
+                    'WriteCapacityUnits': throughput['WriteCapacityUnits'],
+                }
+
+            logger.info(f"Creating index {index_name} on {table_name}.")
+            client.update_table(
+                TableName=table_name,
+                AttributeDefinitions=attribute_definitions,
+                GlobalSecondaryIndexUpdates=[{'Create': index}]
+            )
+            created.append((table_name, index_name))
+            if wait:
+                wait_for_index(table_name, index_name)
+    return created
+
+
+def wait_for_index(table_name, index_name, poll_seconds=10):
+    client = dynamodb.meta.client
+    while True:
+        description = client.describe_table(TableName=table_name)['Table']
+        for gsi in description.get('GlobalSecondaryIndexes', []):
+            if gsi['IndexName'] == index_name and gsi['IndexStatus'] == 'ACTIVE':
+                return
+        time.sleep(poll_seconds)
+
+
+@app.cli.command('create-indexes')
+@click.option('--no-wait', is_flag=True, help='Return as soon as the index creation requests are accepted.')
+def create_indexes_command(no_wait):
+    """Create the secondary indexes the dashboards query."""
+    created = create_missing_indexes(wait=not no_wait)
+    for table_name, index_name in created:
+        click.echo(f"Created {index_name} on {table_name}")
+    if not created:
+        click.echo("All indexes already exist.")
+
+
+def backfill_doctor_emails():
+    # Appointments and prescriptions written before doctor_email existed only carry doctor_name,
+    # so they are invisible to the doctor indexes until this fills the email in. A name shared by
+    # several doctors cannot be resolved from the item alone; those items are left unchanged and
+    # reported under 'ambiguous' ({name: [emails]}) so they can be fixed by hand.
+    emails_by_name = collections.defaultdict(set)
+    for doctor in get_doctors():
+        emails_by_name[doctor['name']].add(doctor['email'])
+    ambiguous = {name: sorted(emails) for name, emails in emails_by_name.items() if len(emails) > 1}
+    updated = skipped = 0
+    touched = set()
+    for table_name in (APPOINTMENTS_TABLE, PRESCRIPTIONS_TABLE):
+        key_name = TABLE_KEYS[table_name]
+        for item in storage.scan(table_name):
+            if 'doctor_email' in item:
+                continue
+            doctor_name = item.get('doctor_name')
+            if doctor_name in ambiguous:
+                logger.warning(f"Several doctors are named {doctor_name!r}; left {table_name} item {item[key_name]} unchanged.")
+                skipped += 1
+                continue
+            doctor_emails = emails_by_name.get(doctor_name)
+            if not doctor_emails:
+                logger.warning(f"No doctor named {doctor_name!r} for {table_name} item {item[key_name]}.")
+                skipped += 1
+                continue
+            (doctor_email,) = doctor_emails
+            storage.update(table_name, item[key_name], {'doctor_email': doctor_email})
+            touched.update((doctor_email, item.get('patient_email')))
+            updated += 1
+    touch_user_data(*touched)
+    return {'updated': updated, 'skipped': skipped, 'ambiguous': ambiguous}
+
+
+@app.cli.command('backfill-doctor-emails')
+def backfill_doctor_emails_command():
+    """Add doctor_email to appointments and prescriptions that only have doctor_name."""
+    result = backfill_doctor_emails()
+    click.echo(f"Updated {result['updated']} items; skipped {result['skipped']}.")
+    for name, emails in result['ambiguous'].items():
+        click.echo(f"Doctor name {name!r} is shared by {', '.join(emails)}; its items were not updated.")
+
+
+# --- Data access helpers ---
+def iter_items(operation, page_size=None, max_items=None, **kwargs):
+    # Lazily yields items from a table.query or table.scan call, following LastEvaluatedKey
+    # across pages. Only one page (at most page_size items) is held at a time.
+    page_size = page_size or DYNAMODB_PAGE_SIZE
+    remaining = max_items
+    while True:
+        kwargs['Limit'] = page_size if remaining is None else min(page_size, remaining)
+        response = operation(**kwargs)
+        for item in response.get('Items', []):
+            yield item
+            if remaining is not None:
+                remaining -= 1
+                if remaining <= 0:
+                    return
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+# --- Circuit breakers and request deadlines ---
+# A web request sets request_deadline (a time.monotonic() value) when it starts. Every guarded
+# downstream call checks it first, so a request that has used up its budget fails fast instead of
+# starting another call that may wait out botocore's full timeout and retry cycle. Background
+# workers never set it and are only limited by the circuit breakers.
+request_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+# Error codes that mean the service (rather than the request) is in trouble.
+DOWNSTREAM_ERROR_CODES = {
+    'ProvisionedThroughputExceededException', 'RequestLimitExceeded', 'ThrottlingException',
+    'Throttling', 'ThrottledException', 'InternalServerError', 'InternalFailure',
+    'ServiceUnavailable', 'KMSThrottlingException',
+}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name, retry_at):
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.name = name
+        # time.time() at which the breaker lets a probe call through again.
+        self.retry_at = retry_at
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def remaining_budget():
+    # Seconds left before the current request's deadline, or None outside a request.
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_downstream_failure(error):
+    # Connection errors, timeouts, throttling and 5xx responses count against a breaker; client
+    # errors such as a failed condition or a bad key are the caller's fault and do not.
+    if isinstance(error, BotoCoreError):
+        return True
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        return code in DOWNSTREAM_ERROR_CODES or status >= 500
+    return False
+
+
+class CircuitBreaker:
+    # closed: calls go through and consecutive failures are counted; failure_threshold of them
+    # open the circuit. open: calls fail at once with CircuitOpenError until reset_timeout has
+    # passed. half_open: a single probe call goes through while the rest keep failing fast; its
+    # success closes the circuit and its failure opens it again for another reset_timeout. Only
+    # the probe decides: calls started before the circuit opened change nothing when they finish.
+    # Within a request, a call is refused unless at least `call_timeout` of the budget is left.
+    def __init__(self, name, failure_threshold, reset_timeout, call_timeout=0.0):
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._call_timeout = call_timeout
+        self._lock = threading.Lock()
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'deadline_exceeded': 0, 'opened': 0}
+
+    def call(self, operation, *args, **kwargs):
+        probe = self._before_call()
+        try:
+            result = operation(*args, **kwargs)
+        except DeadlineExceeded:
+            # Stopped between retries by the request's budget: says nothing about the service.
+            self._after_call(probe, failed=None)
+            raise
+        except Exception as e:
+            self._after_call(probe, failed=is_downstream_failure(e))
+            raise
+        self._after_call(probe, failed=False)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, state=self._state, consecutive_failures=self._failures)
+
+    def _before_call(self):
+        # Returns whether this call is the half-open probe.
+        budget = remaining_budget()
+        with self._lock:
+            if budget is not None and budget <= self._call_timeout:
+                self._stats['deadline_exceeded'] += 1
+                raise DeadlineExceeded(f"Request deadline leaves too little time to call {self.name}")
+            if self._state == 'open' and time.monotonic() - self._opened_at >= self._reset_timeout:
+                self._state = 'half_open'
+                logger.info(f"Circuit for {self.name} is half-open; probing.")
+            if self._state == 'open' or (self._state == 'half_open' and self._probe_in_flight):
+                self._stats['rejected'] += 1
+                raise CircuitOpenError(self.name, self._retry_at())
+            probe = self._state == 'half_open'
+            if probe:
+                self._probe_in_flight = True
+            self._stats['calls'] += 1
+            return probe
+
+    def _after_call(self, probe, failed):
+        # failed is None when the call neither succeeded nor failed (a half-open probe like that
+        # just lets the next call probe instead).
+        with self._lock:
+            if probe:
+                self._probe_in_flight = False
+            if failed is None:
+                return
+            if failed:
+                self._stats['failures'] += 1
+            if not probe and self._state != 'closed':
+                return
+            if not failed:
+                if probe:
+                    logger.info(f"Circuit for {self.name} closed again.")
+                self._state = 'closed'
+                self._failures = 0
+                return
+            self._failures += 1
+            if probe or self._failures >= self._failure_threshold:
+                self._state = 'open'
+                self._opened_at = time.monotonic()
+                self._stats['opened'] += 1
+                logger.warning(f"Circuit for {self.name} opened after {self._failures} consecutive failures.")
+
+    def _retry_at(self):
+        return time.time() + max(0.0, self._reset_timeout - (time.monotonic() - self._opened_at))
+
+
+SNS_CIRCUIT = 'sns'
+circuit_breakers = {
+    name: CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS,
+                         call_timeout=AWS_CONNECT_TIMEOUT + AWS_READ_TIMEOUT)
+    for name in list(TABLE_KEYS) + [SNS_CIRCUIT]
+}
+
+
+# --- Storage backends ---
+# Routes read and write through `storage` instead of boto3 tables directly. Every backend stores
+# items as plain dicts addressed by table name and the key in TABLE_KEYS, and query() answers the
+# same lookups as the DynamoDB indexes in TABLE_INDEXES, ordered by the index sort key.
+class Storage:
+    def get(self, table_name, key):
+        raise NotImplementedError
+
+    def get_many(self, table_name, keys):
+        # {key: item} for those of `keys` that exist, read in as few round trips as the backend allows.
+        raise NotImplementedError
+
+    def put(self, table_name, item):
+        raise NotImplementedError
+
+    def update(self, table_name, key, changes):
+        # Sets every attribute in `changes` on the item, leaving the others untouched.
+        raise NotImplementedError
+
+    def update_if(self, table_name, key, changes, equals=None, not_equals=None):
+        # Like update(), but only if the item exists, every field in `equals` has the given value
+        # and no field in `not_equals` does. Returns whether the item was updated.
+        raise NotImplementedError
+
+    def delete(self, table_name, key):
+        raise NotImplementedError
+
+    def query(self, table_name, field, value, max_items=None):
+        raise NotImplementedError
+
+    def query_page(self, table_name, field, value, sort_key, limit, cursor=None, descending=False):
+        # One page of the items whose `field` is `value`, ordered by `sort_key` and then by the
+        # table key, as a PageReader. Items without the sort key are left out, as they are from a
+        # DynamoDB index.
+        raise NotImplementedError
+
+    def scan(self, table_name):
+        raise NotImplementedError
+
+
+class DynamoDBStorage(Storage):
+    # Every table call goes through that table's circuit breaker (when one is given), so a
+    # struggling table fails fast without holding up requests that use the others.
+    def __init__(self, tables, breakers=None):
+        self.tables = tables
+        self.breakers = breakers or {}
+
+    def get(self, table_name, key):
+        response = self._call(table_name, 'get_item', Key={TABLE_KEYS[table_name]: key})
+        return response.get('Item')
+
+    def get_many(self, table_name, keys, max_attempts=8):
+        # BatchGetItem, 100 keys per request. Keys DynamoDB leaves unprocessed (when throttled) are
+        # requested again after a jittered backoff.
+        key_name = TABLE_KEYS[table_name]
+        table = self.tables[table_name]
+        keys = list(dict.fromkeys(keys))
+        items = {}
+        for start in range(0, len(keys), 100):
+            request = {table.name: {'Keys': [{key_name: key} for key in keys[start:start + 100]]}}
+            for attempt in range(max_attempts):
+                response = self._guarded(table_name, table.meta.client.batch_get_item, RequestItems=request)
+                for item in response.get('Responses', {}).get(table.name, []):
+                    items[item[key_name]] = item
+                request = response.get('UnprocessedKeys')
+                if not request:
+                    break
+                time.sleep(random.uniform(0, min(1.0, 0.05 * 2 ** attempt)))
+            else:
+                raise RuntimeError(f"BatchGetItem on {table_name} left keys unprocessed after {max_attempts} attempts")
+        return items
+
+    def put(self, table_name, item):
+        self._call(table_name, 'put_item', Item=item)
+
+    def update(self, table_name, key, changes):
+        self._call(table_name, 'update_item', **self._update_arguments(table_name, key, changes))
+
+    def update_if(self, table_name, key, changes, equals=None, not_equals=None):
+        arguments = self._update_arguments(table_name, key, changes)
+        names = arguments['ExpressionAttributeNames']
+        values = arguments['ExpressionAttributeValues']
+        names['#key'] = TABLE_KEYS[table_name]
+        conditions = ['attribute_exists(#key)']
+        for i, (field, value) in enumerate((equals or {}).items()):
+            names[f'#e{i}'], values[f':e{i}'] = field, value
+            conditions.append(f'#e{i} = :e{i}')
+        for i, (field, value) in enumerate((not_equals or {}).items()):
+            names[f'#n{i}'], values[f':n{i}'] = field, value
+            conditions.append(f'(attribute_not_exists(#n{i}) OR #n{i} <> :n{i})')
+        try:
+            self._call(table_name, 'update_item', ConditionExpression=' AND '.join(conditions), **arguments)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def _update_arguments(self, table_name, key, changes):
+        fields = list(changes)
+        return {
+            'Key': {TABLE_KEYS[table_name]: key},
+            'UpdateExpression': "SET " + ", ".join(f"#f{i} = :v{i}" for i in range(len(fields))),
+            'ExpressionAttributeNames': {f'#f{i}': field for i, field in enumerate(fields)},
+            'ExpressionAttributeValues': {f':v{i}': changes[field] for i, field in enumerate(fields)},
+        }
+
+    def delete(self, table_name, key):
+        self._call(table_name, 'delete_item', Key={TABLE_KEYS[table_name]: key})
+
+    def query(self, table_name, field, value, max_items=None):
+        index_name = find_index(table_name, field)[0]
+        return iter_items(
+            partial(self._call, table_name, 'query'),
+            max_items=max_items,
+            IndexName=index_name,
+            KeyConditionExpression=Key(field).eq(value)
+        )
+
+    def query_page(self, table_name, field, value, sort_key, limit, cursor=None, descending=False):
+        index = find_index(table_name, field, sort_key)
+        kwargs = {}
+        if cursor:
+            check_page_cursor(table_name, index, value, cursor)
+            kwargs['ExclusiveStartKey'] = cursor
+        # Large pages are fetched DYNAMODB_PAGE_SIZE items per request as the reader advances.
+        items = iter_items(
+            partial(self._call, table_name, 'query'),
+            max_items=limit + 1,
+            IndexName=index[0],
+            KeyConditionExpression=Key(field).eq(value),
+            ScanIndexForward=not descending,
+            **kwargs
+        )
+        return PageReader(items, table_name, index, limit)
+
+    def scan(self, table_name):
+        return iter_items(partial(self._call, table_name, 'scan'))
+
+    def _call(self, table_name, action, **kwargs):
+        return self._guarded(table_name, getattr(self.tables[table_name], action), **kwargs)
+
+    def _guarded(self, table_name, operation, **kwargs):
+        breaker = self.breakers.get(table_name)
+        return breaker.call(operation, **kwargs) if breaker else operation(**kwargs)
+
+
+def item_matches(item, equals, not_equals):
+    # The condition of Storage.update_if() for the local backends.
+    return (item is not None
+            and all(item.get(field) == value for field, value in (equals or {}).items())
+            and all(item.get(field) != value for field, value in (not_equals or {}).items()))
+
+
+class MemoryStorage(Storage):
+    # Dict-backed storage for a single process. Items are copied in and out so callers can never
+    # mutate stored state, and each indexed field has a value -> keys map so query() does not
+    # walk the whole table.
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tables = {table_name: {} for table_name in TABLE_KEYS}
+        self._indexes = {
+            (table_name, index[1]): {}
+            for table_name, indexes in TABLE_INDEXES.items() for index in indexes
+        }
+
+    def get(self, table_name, key):
+        with self._lock:
+            item = self._tables[table_name].get(key)
+            return copy.deepcopy(item) if item is not None else None
+
+    def get_many(self, table_name, keys):
+        with self._lock:
+            table = self._tables[table_name]
+            return {key: copy.deepcopy(table[key]) for key in keys if key in table}
+
+    def put(self, table_name, item):
+        item = copy.deepcopy(item)
+        key = item[TABLE_KEYS[table_name]]
+        with self._lock:
+            self._unindex(table_name, self._tables[table_name].get(key))
+            self._tables[table_name][key] = item
+            self._index(table_name, item)
+
+    def update(self, table_name, key, changes):
+        with self._lock:
+            item = self._tables[table_name].get(key) or {TABLE_KEYS[table_name]: key}
+            self._unindex(table_name, item)
+            item.update(copy.deepcopy(changes))
+            self._tables[table_name][key] = item
+            self._index(table_name, item)
+
+    def update_if(self, table_name, key, changes, equals=None, not_equals=None):
+        with self._lock:
+            item = self._tables[table_name].get(key)
+            if not item_matches(item, equals, not_equals):
+                return False
+            self._unindex(table_name, item)
+            item.update(copy.deepcopy(changes))
+            self._index(table_name, item)
+        return True
+
+    def delete(self, table_name, key):
+        with self._lock:
+            self._unindex(table_name, self._tables[table_name].pop(key, None))
+
+    def query(self, table_name, field, value, max_items=None):
+        sort_key = find_index(table_name, field)[2]
+        with self._lock:
+            keys = self._indexes[(table_name, field)].get(value, ())
+            items = [copy.deepcopy(self._tables[table_name][key]) for key in keys]
+        if sort_key:
+            items.sort(key=lambda item: str(item.get(sort_key) or ''))
+        return iter(items[:max_items] if max_items else items)
+
+    def query_page(self, table_name, field, value, sort_key, limit, cursor=None, descending=False):
+        index = find_index(table_name, field, sort_key)
+        key_name = TABLE_KEYS[table_name]
+        position = None
+        if cursor:
+            check_page_cursor(table_name, index, value, cursor)
+            position = (cursor[sort_key], cursor[key_name])
+        with self._lock:
+            table = self._tables[table_name]
+            positions = sorted(
+                ((table[key][sort_key], key) for key in self._indexes[(table_name, field)].get(value, ())
+                 if table[key].get(sort_key) is not None),
+                reverse=descending
+            )
+            if position is not None:
+                positions = [p for p in positions if (p < position if descending else p > position)]
+        return PageReader(self._copy_items(table_name, positions[:limit + 1]), table_name, index, limit)
+
+    def _copy_items(self, table_name, positions):
+        # Copies each item as it is read; items deleted in the meantime are skipped.
+        for _, key in positions:
+            with self._lock:
+                item = self._tables[table_name].get(key)
+                item = copy.deepcopy(item) if item is not None else None
+            if item is not None:
+                yield item
+
+    def scan(self, table_name):
+        with self._lock:
+            return iter(copy.deepcopy(list(self._tables[table_name].values())))
+
+    def _index(self, table_name, item):
+        key = item[TABLE_KEYS[table_name]]
+        for index in TABLE_INDEXES.get(table_name, []):
+            if item.get(index[1]) is not None:
+                self._indexes[(table_name, index[1])].setdefault(item[index[1]], set()).add(key)
+
+    def _unindex(self, table_name, item):
+        if item is None:
+            return
+        key = item[TABLE_KEYS[table_name]]
+        for index in TABLE_INDEXES.get(table_name, []):
+            keys = self._indexes[(table_name, index[1])].get(item.get(index[1]))
+            if keys is not None:
+                keys.discard(key)
+
+
+def _json_default(value):
+    # Items read from DynamoDB carry numbers as Decimal.
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class SQLiteStorage(Storage):
+    # Stores each item as a JSON document next to its key and indexed fields, one SQLite table per
+    # DynamoDB table. Each thread gets its own connection; WAL mode lets several worker processes
+    # on the same host read while one writes.
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._columns = {
+            table_name: sorted({field for index in TABLE_INDEXES.get(table_name, []) for field in index[1:] if field})
+            for table_name in TABLE_KEYS
+        }
+        self._create_schema()
+
+    def get(self, table_name, key):
+        row = self._connection().execute(f'SELECT item FROM "{table_name}" WHERE pk = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, table_name, keys, chunk_size=500):
+        # Chunked to stay under SQLite's limit on bound parameters.
+        keys = list(dict.fromkeys(keys))
+        items = {}
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            rows = self._connection().execute(
+                f'SELECT pk, item FROM "{table_name}" WHERE pk IN ({", ".join("?" * len(chunk))})', chunk
+            )
+            items.update((row[0], json.loads(row[1])) for row in rows)
+        return items
+
+    def put(self, table_name, item):
+        self._write(self._connection(), table_name, item)
+
+    def update(self, table_name, key, changes):
+        connection = self._connection()
+        # BEGIN IMMEDIATE takes the write lock before reading, so concurrent updates cannot interleave.
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(f'SELECT item FROM "{table_name}" WHERE pk = ?', (key,)).fetchone()
+            item = json.loads(row[0]) if row else {TABLE_KEYS[table_name]: key}
+            item.update(changes)
+            self._write(connection, table_name, item)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def update_if(self, table_name, key, changes, equals=None, not_equals=None):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(f'SELECT item FROM "{table_name}" WHERE pk = ?', (key,)).fetchone()
+            item = json.loads(row[0]) if row else None
+            matched = item_matches(item, equals, not_equals)
+            if matched:
+                item.update(changes)
+                self._write(connection, table_name, item)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return matched
+
+    def delete(self, table_name, key):
+        self._connection().execute(f'DELETE FROM "{table_name}" WHERE pk = ?', (key,))
+
+    def query(self, table_name, field, value, max_items=None):
+        sort_key = find_index(table_name, field)[2]
+        sql = f'SELECT item FROM "{table_name}" WHERE "{field}" = ?'
+        if sort_key:
+            sql += f' ORDER BY "{sort_key}"'
+        if max_items:
+            sql += f' LIMIT {int(max_items)}'
+        return (json.loads(row[0]) for row in self._connection().execute(sql, (value,)))
+
+    def query_page(self, table_name, field, value, sort_key, limit, cursor=None, descending=False):
+        index = find_index(table_name, field, sort_key)
+        direction = 'DESC' if descending else 'ASC'
+        sql = f'SELECT item FROM "{table_name}" WHERE "{field}" = ? AND "{sort_key}" IS NOT NULL'
+        params = [value]
+        if cursor:
+            check_page_cursor(table_name, index, value, cursor)
+            sql += f' AND ("{sort_key}", pk) {"<" if descending else ">"} (?, ?)'
+            params += [cursor[sort_key], cursor[TABLE_KEYS[table_name]]]
+        sql += f' ORDER BY "{sort_key}" {direction}, pk {direction} LIMIT ?'
+        rows = self._connection().execute(sql, params + [limit + 1])
+        return PageReader((json.loads(row[0]) for row in rows), table_name, index, limit)
+
+    def scan(self, table_name, page_size=None):
+        # Pages by primary key so callers may write to the table while iterating.
+        page_size = page_size or DYNAMODB_PAGE_SIZE
+        last_key = ''
+        while True:
+            rows = self._connection().execute(
+                f'SELECT pk, item FROM "{table_name}" WHERE pk > ? ORDER BY pk LIMIT ?', (last_key, page_size)
+            ).fetchall()
+            for row in rows:
+                yield json.loads(row[1])
+            if len(rows) < page_size:
+                return
+            last_key = rows[-1][0]
+
+    def _write(self, connection, table_name, item):
+        columns = self._columns[table_name]
+        column_list = ''.join(f', "{column}"' for column in columns)
+        placeholders = ', ?' * len(columns)
+        values = [item[TABLE_KEYS[table_name]]] + [item.get(column) for column in columns]
+        connection.execute(
+            f'INSERT OR REPLACE INTO "{table_name}" (pk{column_list}, item) VALUES (?{placeholders}, ?)',
+            values + [json.dumps(item, default=_json_default)]
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # isolation_level=None: every statement commits on its own unless a transaction is opened explicitly.
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        connection = self._connection()
+        for table_name, columns in self._columns.items():
+            column_definitions = ''.join(f', "{column}" TEXT' for column in columns)
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table_name}" (pk TEXT PRIMARY KEY{column_definitions}, item TEXT NOT NULL)'
+            )
+            # Columns for indexes added since the file was created are filled from the stored items.
+            existing = {row[1] for row in connection.execute(f'PRAGMA table_info("{table_name}")')}
+            for column in columns:
+                if column not in existing:
+                    connection.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{column}" TEXT')
+                    connection.execute(f'UPDATE "{table_name}" SET "{column}" = json_extract(item, ?)', (f'$.{column}',))
+            for index_name, hash_key, range_key in TABLE_INDEXES.get(table_name, []):
+                indexed_columns = f'"{hash_key}", "{range_key}"' if range_key else f'"{hash_key}"'
+                connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{table_name}_{index_name}" ON "{table_name}" ({indexed_columns})'
+                )
+
+
+def create_storage(backend):
+    if backend == 'dynamodb':
+        return DynamoDBStorage(TABLES, circuit_breakers)
+    if backend == 'sqlite':
+        return SQLiteStorage(SQLITE_PATH)
+    if backend == 'memory':
+        return MemoryStorage()
+    raise ValueError(f"Unknown MEDTRACK_STORAGE backend {backend!r}; expected dynamodb, sqlite or memory.")
+
+
+storage = create_storage(STORAGE_BACKEND)
+logger.info(f"Using {STORAGE_BACKEND} storage backend.")
+
+
+def get_doctors():
+    # Not capped: the doctor directory is read once per DOCTOR_DIRECTORY_TTL and must be complete.
+    return storage.query(USERS_TABLE, 'user_type', 'doctor')
+
+
+# --- Doctor directory cache ---
+# The doctor list only changes when a doctor registers, so it is cached in-process for
+# DOCTOR_DIRECTORY_TTL seconds. Only one thread reloads an expired entry; the others wait for it
+# instead of all reading the users table at once. register() invalidates it explicitly; other
+# workers pick the new doctor up when their copy expires.
+class DoctorDirectory:
+    def __init__(self, loader, ttl_seconds):
+        self._loader = loader
+        self._ttl_seconds = ttl_seconds
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._doctors = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self):
+        if self._is_fresh():
+            self._count('hits')
+            return self._doctors
+
+        with self._load_lock:
+            # Another thread may have reloaded while this one waited for the lock.
+            if self._is_fresh():
+                self._count('hits')
+                return self._doctors
+
+            self._count('misses')
+            generation = self._generation
+            doctors = self._loader()
+            self._doctors = doctors
+            # An invalidation that arrived during the load leaves the new copy already expired.
+            if generation == self._generation:
+                self._expires_at = time.monotonic() + self._ttl_seconds
+            return doctors
+
+    def invalidate(self):
+        self._generation += 1
+        self._expires_at = 0.0
+        self._count('invalidations')
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'cached_doctors': len(self._doctors) if self._doctors is not None else 0,
+                'ttl_seconds': self._ttl_seconds,
+            }
+
+    def _is_fresh(self):
+        return self._doctors is not None and time.monotonic() < self._expires_at
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def load_doctor_directory():
+    return [serialize_doc(dict(doc, medical_license=doc.get('medical_license', 'N/A'))) for doc in get_doctors()]
+
+
+doctor_directory = DoctorDirectory(load_doctor_directory, DOCTOR_DIRECTORY_TTL)
+
+
+# --- Parallel scans for maintenance jobs ---
+class CapacityRateLimiter:
+    # Token bucket over consumed read capacity units, shared by all segments of a scan. A page that
+    # overdraws the bucket makes the next caller sleep until the debt has been refilled.
+    def __init__(self, units_per_second):
+        self.units_per_second = units_per_second
+        self._lock = threading.Lock()
+        self._available = units_per_second
+        self._updated_at = time.monotonic()
+
+    def consume(self, units):
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(self.units_per_second,
+                                  self._available + (now - self._updated_at) * self.units_per_second)
+            self._updated_at = now
+            self._available -= units
+            delay = -self._available / self.units_per_second if self._available < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+
+
+class ParallelScanner:
+    # Reads a whole table as `total_segments` Segment/TotalSegments scans running on their own
+    # threads and hands every page to `process_page(segment, items)`.
+    #
+    # With a checkpoint_path, each segment's LastEvaluatedKey is saved after its page has been
+    # processed, so an interrupted run started again with the same path and segment count
+    # resumes where every segment stopped (pages are processed at least once).
+    # max_read_units_per_second throttles the scan on the capacity DynamoDB reports as consumed.
+    def __init__(self, table, total_segments=None, checkpoint_path=None, max_read_units_per_second=None,
+                 page_size=None, **scan_kwargs):
+        self.table = table
+        self.total_segments = total_segments or PARALLEL_SCAN_SEGMENTS
+        self.checkpoint_path = checkpoint_path
+        self.page_size = page_size or DYNAMODB_PAGE_SIZE
+        self.scan_kwargs = scan_kwargs
+        self.rate_limiter = CapacityRateLimiter(max_read_units_per_second) if max_read_units_per_second else None
+        self._checkpoint_lock = threading.Lock()
+        self._checkpoint = self._load_checkpoint()
+
+    def run(self, process_page):
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.total_segments, thread_name_prefix=f'scan-{self.table.name}') as pool:
+            segment_reports = list(pool.map(lambda segment: self._scan_segment(segment, process_page),
+                                            range(self.total_segments)))
+        elapsed = time.monotonic() - started
+
+        scanned = sum(report['scanned'] for report in segment_reports)
+        report = {
+            'table': self.table.name,
+            'segments': self.total_segments,
+            'scanned': scanned,
+            'consumed_read_units': sum(report['consumed_read_units'] for report in segment_reports),
+            'resumed_segments': sum(1 for report in segment_reports if report['resumed']),
+            'seconds': round(elapsed, 3),
+            'items_per_second': round(scanned / elapsed, 1) if elapsed else 0.0,
+        }
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return report
+
+    def _scan_segment(self, segment, process_page):
+        state = self._checkpoint['segments'].get(str(segment), {})
+        report = {'scanned': 0, 'consumed_read_units': 0.0, 'resumed': bool(state)}
+        if state.get('done'):
+            return report
+
+        kwargs = dict(self.scan_kwargs, Segment=segment, TotalSegments=self.total_segments,
+                      Limit=self.page_size, ReturnConsumedCapacity='TOTAL')
+        if state.get('last_evaluated_key'):
+            kwargs['ExclusiveStartKey'] = state['last_evaluated_key']
+
+        while True:
+            response = self.table.scan(**kwargs)
+            items = response.get('Items', [])
+            process_page(segment, items)
+            report['scanned'] += len(items)
+
+            consumed = float(response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+            report['consumed_read_units'] += consumed
+            if self.rate_limiter:
+                self.rate_limiter.consume(consumed)
+
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            self._save_checkpoint(segment, last_evaluated_key)
+            if not last_evaluated_key:
+                return report
+            kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    def _load_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+            if checkpoint.get('table') == self.table.name and checkpoint.get('total_segments') == self.total_segments:
+                logger.info(f"Resuming parallel scan of {self.table.name} from {self.checkpoint_path}.")
+                return checkpoint
+            logger.warning(f"Ignoring checkpoint {self.checkpoint_path}: it belongs to a different scan.")
+        return {'table': self.table.name, 'total_segments': self.total_segments, 'segments': {}}
+
+    def _save_checkpoint(self, segment, last_evaluated_key):
+        if not self.checkpoint_path:
+            return
+        with self._checkpoint_lock:
+            self._checkpoint['segments'][str(segment)] = {
+                'last_evaluated_key': last_evaluated_key,
+                'done': last_evaluated_key is None,
+            }
+            temporary_path = f"{self.checkpoint_path}.tmp"
+            with open(temporary_path, 'w') as checkpoint_file:
+                json.dump(self._checkpoint, checkpoint_file)
+            os.replace(temporary_path, self.checkpoint_path)
+
+
+@app.cli.command('scan-table')
+@click.argument('table_name')
+@click.option('--segments', type=int, default=None, help='Parallel scan segments (default PARALLEL_SCAN_SEGMENTS).')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), default=None, help='File used to resume an interrupted scan.')
+@click.option('--max-rcu', type=float, default=None, help='Maximum read capacity units consumed per second.')
+def scan_table_command(table_name, segments, checkpoint, max_rcu):
+    """Read a whole table with a parallel scan and report the item count."""
+    if not isinstance(storage, DynamoDBStorage):
+        raise click.UsageError("scan-table needs MEDTRACK_STORAGE=dynamodb.")
+    if table_name not in TABLE_KEYS:
+        raise click.BadParameter(f"must be one of {', '.join(sorted(TABLE_KEYS))}", param_hint='TABLE_NAME')
+    scanner = ParallelScanner(storage.tables[table_name], total_segments=segments, checkpoint_path=checkpoint,
+                              max_read_units_per_second=max_rcu)
+    report = scanner.run(lambda segment, items: None)
+    click.echo(json.dumps(report))
+
+
+# --- Medication reminder daily rollover ---
+def roll_over_reminder(reminder, today):
+    # Applies the start-of-day rules to a reminder in place and returns True if anything changed:
+    # past reminders still Pending become Missed, and daily reminders not yet checked today are
+    # reset to Pending / not taken.
+    changed = False
+    if (reminder.get('date') or '') < today and reminder.get('status') == 'Pending':
+        reminder['status'] = 'Missed'
+        changed = True
+
+    if reminder.get('frequency') and 'daily' in reminder['frequency'] and reminder.get('last_checked_date') != today:
+        reminder['taken_today'] = False
+        reminder['status'] = 'Pending'
+        reminder['last_checked_date'] = today
+        changed = True
+    return changed
+
+
+# The attributes the rollover may change; nothing else is written back.
+ROLLOVER_FIELDS = ('status', 'taken_today', 'last_checked_date')
+
+
+def rollover_update(reminder, today):
+    # The rollover of a scanned reminder as update_if() arguments (changes, equals, not_equals), or
+    # None if nothing changes. A scanned copy may be stale by the time it is written, so a reset for
+    # a new day only applies while the reminder has not been checked today (patients roll it over
+    # themselves before marking a dose), and marking it Missed only while it is still Pending.
+    rolled = dict(reminder)
+    if not roll_over_reminder(rolled, today):
+        return None
+    changes = {field: rolled[field] for field in ROLLOVER_FIELDS
+               if field in rolled and (field not in reminder or rolled[field] != reminder[field])}
+    if 'last_checked_date' in changes:
+        return changes, None, {'last_checked_date': today}
+    return changes, {'status': 'Pending'}, None
+
+
+def rollover_reminders(total_segments=None, today=None, checkpoint_path=None, max_read_units_per_second=None):
+    # Rolls every reminder in the table over to `today`, reading it with a ParallelScanner and
+    # writing only the changed attributes back with conditional updates, so a reminder deleted or
+    # marked by its patient since it was scanned is left alone ('skipped' in the report).
+    # Meant to run shortly after midnight (cron/systemd timer running `flask --app app rollover-reminders`).
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    if not isinstance(storage, DynamoDBStorage):
+        return _rollover_reminders_serially(today)
+
+    total_segments = total_segments or REMINDER_ROLLOVER_SEGMENTS
+    table = storage.tables[MEDICATION_REMINDERS_TABLE]
+    needs_rollover = (
+        (boto3.dynamodb.conditions.Attr('date').lt(today) & boto3.dynamodb.conditions.Attr('status').eq('Pending'))
+        | (boto3.dynamodb.conditions.Attr('frequency').contains('daily')
+           & (boto3.dynamodb.conditions.Attr('last_checked_date').not_exists()
+              | boto3.dynamodb.conditions.Attr('last_checked_date').ne(today)))
+    )
+
+    updated_counts = [0] * total_segments
+    skipped_counts = [0] * total_segments
+
+    def roll_over_page(segment, reminders):
+        # Each page's writes finish before the scanner checkpoints past it.
+        for reminder in reminders:
+            update = rollover_update(reminder, today)
+            if update is None:
+                continue
+            if storage.update_if(MEDICATION_REMINDERS_TABLE, reminder['reminder_id'], *update):
+                updated_counts[segment] += 1
+            else:
+                skipped_counts[segment] += 1
+
+    scanner = ParallelScanner(table, total_segments=total_segments, checkpoint_path=checkpoint_path,
+                              max_read_units_per_second=max_read_units_per_second, FilterExpression=needs_rollover)
+    report = scanner.run(roll_over_page)
+    report['date'] = today
+    report['updated'] = sum(updated_counts)
+    report['skipped'] = sum(skipped_counts)
+    logger.info(f"Reminder rollover finished: {report}")
+    return report
+
+
+def _rollover_reminders_serially(today):
+    # SQLite and in-memory storage are local, so one pass over the table is enough there.
+    started = time.monotonic()
+    scanned = 0
+    updated = 0
+    skipped = 0
+    for reminder in storage.scan(MEDICATION_REMINDERS_TABLE):
+        scanned += 1
+        update = rollover_update(reminder, today)
+        if update is None:
+            continue
+        if storage.update_if(MEDICATION_REMINDERS_TABLE, reminder['reminder_id'], *update):
+            updated += 1
+        else:
+            skipped += 1
+    elapsed = time.monotonic() - started
+    report = {
+        'table': MEDICATION_REMINDERS_TABLE,
+        'date': today,
+        'segments': 1,
+        'scanned': scanned,
+        'updated': updated,
+        'skipped': skipped,
+        'seconds': round(elapsed, 3),
+        'items_per_second': round(scanned / elapsed, 1) if elapsed else 0.0,
+    }
+    logger.info(f"Reminder rollover finished: {report}")
+    return report
+
+
+@app.cli.command('rollover-reminders')
+@click.option('--segments', type=int, default=None, help='Parallel scan segments (default REMINDER_ROLLOVER_SEGMENTS).')
+@click.option('--date', 'today', default=None, help='Roll over to this YYYY-MM-DD date instead of today.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), default=None, help='File used to resume an interrupted run.')
+@click.option('--max-rcu', type=float, default=None, help='Maximum read capacity units consumed per second.')
+def rollover_reminders_command(segments, today, checkpoint, max_rcu):
+    """Mark past reminders missed and reset daily reminders for a new day."""
+    report = rollover_reminders(total_segments=segments, today=today, checkpoint_path=checkpoint,
+                                max_read_units_per_second=max_rcu)
+    click.echo(f"Scanned {report['scanned']} and updated {report['updated']} reminders "
+               f"in {report['seconds']}s ({report['items_per_second']} items/s); "
+               f"{report['skipped']} changed since the scan were skipped.")
+
+
+# --- Notification outbox ---
+# Durable outbox for SNS notifications. enqueue() appends the notification to a local SQLite log
+# and returns immediately; NOTIFICATION_WORKERS threads lease due events from the log and publish
+# them in batches. `publish_batch(events)` returns {event_id: error} for the entries SNS rejected,
+# so one bad entry only sends that entry back for retry.
+# Events for a recipient that are not urgent join that recipient's open digest window and are
+# published together as one message when it closes; urgent events are due immediately. An event stays in the log until SNS accepts it: failed publishes are retried with
+# exponential backoff and full jitter, and a lease that expires (for example because the process
+# died mid-publish) makes the event due again. Delivery is therefore at-least-once; each message
+# carries its event_id so subscribers can drop duplicates, and an event_id is only stored once.
+class NotificationOutbox:
+    def __init__(self, path, publish_batch, max_backlog, workers, lease_seconds, retry_base_seconds,
+                 retry_max_seconds, poll_seconds, retention_seconds, batch_size, linger_seconds,
+                 digest_window_seconds, digest_max_events):
+        self.path = path
+        self._digest_window_seconds = digest_window_seconds
+        self._digest_max_events = digest_max_events
+        self._publish_batch = publish_batch
+        self._batch_size = batch_size
+        self._linger_seconds = linger_seconds
+        self._max_backlog = max_backlog
+        self._worker_count = workers
+        self._lease_seconds = lease_seconds
+        self._retry_base_seconds = retry_base_seconds
+        self._retry_max_seconds = retry_max_seconds
+        self._poll_seconds = poll_seconds
+        self._retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._workers = []
+        self._stopping = False
+        self._last_purge = 0.0
+        self._stats = {
+            'enqueued': 0,
+            'duplicates': 0,
+            'published': 0,
+            'batches': 0,
+            'digests': 0,
+            'coalesced': 0,
+            'failed_attempts': 0,
+            'deferred': 0,
+            'dropped': 0,
+            'worker_errors': 0,
+            'publish_seconds_total': 0.0,
+            'publish_seconds_max': 0.0,
+            'delivery_seconds_max': 0.0,
+        }
+        self._create_schema()
+        self._backlog = self._count_pending()
+
+    def enqueue(self, subject, message, event_id=None, recipient=None, urgent=False):
+        return self.enqueue_many([{'subject': subject, 'message': message, 'event_id': event_id,
+                                   'recipient': recipient, 'urgent': urgent}])[0]
+
+    def enqueue_many(self, events):
+        # Appends events (dicts of enqueue()'s arguments) in one transaction and returns their event
+        # ids, with None for those dropped because the backlog is full.
+        event_ids = [None] * len(events)
+        accepted = events[:max(0, self._max_backlog - self._backlog)]
+        for event in events[len(accepted):]:
+            self._count('dropped')
+            logger.error(f"Notification outbox backlog is full ({self._backlog} events); "
+                         f"dropped notification '{event['subject']}'.")
+        if not accepted:
+            return event_ids
+
+        now = time.time()
+        inserted = 0
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for position, event in enumerate(accepted):
+                event_id = event.get('event_id') or str(uuid.uuid4())
+                recipient = event.get('recipient')
+                digest = bool(recipient) and not event.get('urgent') and self._digest_window_seconds > 0
+                due_at = self._digest_window_end(connection, recipient, now) if digest else now
+                cursor = connection.execute(
+                    'INSERT OR IGNORE INTO outbox (event_id, subject, message, created_at, next_attempt_at, recipient, digest) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (event_id, event['subject'], event['message'], now, due_at, recipient, int(digest))
+                )
+                inserted += cursor.rowcount
+                event_ids[position] = event_id
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        with self._lock:
+            self._backlog += inserted
+            self._stats['enqueued'] += inserted
+            self._stats['duplicates'] += len(accepted) - inserted
+
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify(len(accepted))
+        return event_ids
+
+    def start(self):
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers or self._stopping:
+                return
+            for number in range(self._worker_count):
+                worker = threading.Thread(target=self._run, name=f'notification-outbox-{number}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def shutdown(self, timeout=None):
+        # Workers keep publishing until nothing is due, then exit. Anything still undelivered stays
+        # in the log and is sent by the next process that opens it.
+        with self._lock:
+            self._stopping = True
+            workers, self._workers = self._workers, []
+        with self._wakeup:
+            self._wakeup.notify_all()
+        deadline = time.monotonic() + (timeout or 0)
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()) if timeout else None)
+        pending = self._count_pending()
+        if pending:
+            logger.warning(f"Notification outbox stopped with {pending} notifications pending in {self.path}.")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._backlog
+        stats['queue_capacity'] = self._max_backlog
+        stats['publish_seconds_avg'] = round(stats.pop('publish_seconds_total') / (stats['batches'] or 1), 4)
+        stats['batch_size_avg'] = round(stats['published'] / (stats['batches'] or 1), 2)
+        return stats
+
+    def _run(self):
+        while True:
+            try:
+                events = self._claim_batch()
+                if events:
+                    self._deliver(events)
+                    continue
+                if self._stopping:
+                    return
+                self._purge_delivered()
+            except Exception as e:
+                # A worker must outlive any one failure (say, the log staying locked past the
+                # SQLite timeout): it is never restarted. Events it had claimed become due again
+                # when their lease expires.
+                self._count('worker_errors')
+                logger.error(f"Notification outbox worker error: {e}")
+                if self._stopping:
+                    return
+            with self._wakeup:
+                self._wakeup.wait(self._poll_seconds)
+
+    def _claim_batch(self):
+        # A batch is sent when it is full or when NOTIFICATION_LINGER_SECONDS has passed since its
+        # first event was claimed, whichever comes first.
+        events = self._claim_due_events(limit=self._batch_size)
+        if not events or self._stopping:
+            return events
+        linger_until = time.monotonic() + self._linger_seconds
+        while len(events) < self._batch_size:
+            remaining = linger_until - time.monotonic()
+            if remaining <= 0:
+                break
+            with self._wakeup:
+                self._wakeup.wait(remaining)
+            events += self._claim_due_events(limit=self._batch_size - len(events))
+        return events
+
+    def _deliver(self, events):
+        # Digest events claimed together for one recipient become a single SNS entry; if that entry
+        # fails, every event in it is retried.
+        entries = []
+        digest_groups = {}
+        for event in events:
+            if event['digest'] and event['recipient']:
+                if event['recipient'] not in digest_groups:
+                    digest_groups[event['recipient']] = []
+                    entries.append(digest_groups[event['recipient']])
+                digest_groups[event['recipient']].append(event)
+            else:
+                entries.append([event])
+        messages = [group[0] if len(group) == 1 else build_digest(group) for group in entries]
+
+        started = time.monotonic()
+        try:
+            failures = self._publish_batch(messages)
+        except CircuitOpenError as e:
+            # SNS is known to be down: hold the events until the breaker lets a probe through
+            # rather than spending their retry attempts on it.
+            self._defer(events, e.retry_at, e)
+            return
+        except Exception as e:
+            failures = {message['event_id']: e for message in messages}
+        elapsed = time.monotonic() - started
+
+        delivered = []
+        for group, message in zip(entries, messages):
+            if message['event_id'] in failures:
+                for event in group:
+                    self._schedule_retry(event, failures[message['event_id']])
+            else:
+                delivered.extend(group)
+                if len(group) > 1:
+                    with self._lock:
+                        self._stats['digests'] += 1
+                        self._stats['coalesced'] += len(group)
+        if not delivered:
+            return
+
+        now = time.time()
+        self._connection().executemany(
+            'UPDATE outbox SET delivered_at = ? WHERE event_id = ?',
+            [(now, event['event_id']) for event in delivered]
+        )
+        with self._lock:
+            self._backlog = max(0, self._backlog - len(delivered))
+            self._stats['published'] += len(delivered)
+            self._stats['batches'] += 1
+            self._stats['publish_seconds_total'] += elapsed
+            self._stats['publish_seconds_max'] = max(self._stats['publish_seconds_max'], elapsed)
+            self._stats['delivery_seconds_max'] = max(
+                self._stats['delivery_seconds_max'], now - min(event['created_at'] for event in delivered)
+            )
+        logger.info(f"Published {len(delivered)} SNS notifications in one batch.")
+
+    def _schedule_retry(self, event, error):
+        attempts = event['attempts'] + 1
+        delay = random.uniform(0, min(self._retry_max_seconds, self._retry_base_seconds * 2 ** attempts))
+        self._connection().execute(
+            'UPDATE outbox SET attempts = ?, next_attempt_at = ?, leased_until = NULL, last_error = ? WHERE event_id = ?',
+            (attempts, time.time() + delay, str(error)[:500], event['event_id'])
+        )
+        self._count('failed_attempts')
+        logger.error(f"Failed to send SNS notification '{event['subject']}' (attempt {attempts}, "
+                     f"retrying in {delay:.1f}s): {error}")
+
+    def _defer(self, events, until, reason):
+        self._connection().executemany(
+            'UPDATE outbox SET next_attempt_at = ?, leased_until = NULL, last_error = ? WHERE event_id = ?',
+            [(until + random.uniform(0, self._poll_seconds), str(reason)[:500], event['event_id']) for event in events]
+        )
+        with self._lock:
+            self._stats['deferred'] += len(events)
+        logger.warning(f"Deferred {len(events)} SNS notifications: {reason}")
+
+    def _claim_due_events(self, limit):
+        # Leasing pushes next_attempt_at past the lease, so no other worker (in this or another
+        # process sharing the file) picks the same events up while they are being published.
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            columns = 'event_id, subject, message, created_at, attempts, recipient, digest'
+            rows = connection.execute(
+                f'SELECT {columns} FROM outbox '
+                'WHERE delivered_at IS NULL AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?',
+                (now, limit)
+            ).fetchall()
+            # Pull in the rest of each due digest so a recipient's window goes out as one message.
+            digest_recipients = {row[5] for row in rows if row[6]}
+            claimed = {row[0] for row in rows}
+            for recipient in digest_recipients:
+                for row in connection.execute(
+                    f'SELECT {columns} FROM outbox WHERE recipient = ? AND digest = 1 '
+                    'AND delivered_at IS NULL AND next_attempt_at <= ? ORDER BY created_at LIMIT ?',
+                    (recipient, now, self._digest_max_events)
+                ):
+                    if row[0] not in claimed:
+                        claimed.add(row[0])
+                        rows.append(row)
+            connection.executemany(
+                'UPDATE outbox SET next_attempt_at = ?, leased_until = ? WHERE event_id = ?',
+                [(now + self._lease_seconds, now + self._lease_seconds, row[0]) for row in rows]
+            )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return [
+            {'event_id': row[0], 'subject': row[1], 'message': row[2], 'created_at': row[3], 'attempts': row[4],
+             'recipient': row[5], 'digest': bool(row[6])}
+            for row in rows
+        ]
+
+    def _digest_window_end(self, connection, recipient, now):
+        # Joins the recipient's open window if it has one with room left, otherwise opens a new one.
+        # A leased window is being published already (its lease pushed next_attempt_at ahead), so
+        # an event joining it would only wait a lease for the next one.
+        row = connection.execute(
+            'SELECT MAX(next_attempt_at), COUNT(*) FROM outbox WHERE recipient = ? AND digest = 1 '
+            'AND delivered_at IS NULL AND attempts = 0 AND next_attempt_at > ? '
+            'AND (leased_until IS NULL OR leased_until <= ?)',
+            (recipient, now, now)
+        ).fetchone()
+        if row[0] is not None and row[1] < self._digest_max_events:
+            return row[0]
+        return now + self._digest_window_seconds
+
+    def _purge_delivered(self):
+        now = time.time()
+        if now - self._last_purge < self._retention_seconds / 10:
+            return
+        self._last_purge = now
+        # Delivered events are kept for a while so a replayed event_id is still recognised.
+        self._connection().execute('DELETE FROM outbox WHERE delivered_at < ?', (now - self._retention_seconds,))
+        # Other processes sharing the log deliver events too, so refresh the backlog from the file.
+        pending = self._count_pending()
+        with self._lock:
+            self._backlog = pending
+
+    def _count_pending(self):
+        return self._connection().execute('SELECT COUNT(*) FROM outbox WHERE delivered_at IS NULL').fetchone()[0]
+
+    def _count(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'event_id TEXT PRIMARY KEY, subject TEXT NOT NULL, message TEXT NOT NULL, created_at REAL NOT NULL, '
+            'next_attempt_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, delivered_at REAL, last_error TEXT)'
+        )
+        # Logs created before digests existed lack the recipient/digest/leased_until columns.
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(outbox)')}
+        if 'recipient' not in columns:
+            connection.execute('ALTER TABLE outbox ADD COLUMN recipient TEXT')
+        if 'digest' not in columns:
+            connection.execute('ALTER TABLE outbox ADD COLUMN digest INTEGER NOT NULL DEFAULT 0')
+        if 'leased_until' not in columns:
+            connection.execute('ALTER TABLE outbox ADD COLUMN leased_until REAL')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt_at) WHERE delivered_at IS NULL'
+        )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS outbox_recipient ON outbox (recipient, next_attempt_at) WHERE delivered_at IS NULL'
+        )
+
+
+def notification_attributes(event):
+    # The recipient attribute lets SNS subscription filter policies route messages per user.
+    attributes = {'event_id': {'DataType': 'String', 'StringValue': event['event_id']}}
+    if event.get('recipient'):
+        attributes['recipient'] = {'DataType': 'String', 'StringValue': event['recipient']}
+    if event.get('digest_of'):
+        attributes['digest_of'] = {'DataType': 'String', 'StringValue': event['digest_of']}
+    return attributes
+
+
+def build_digest(events):
+    # One message summarising several events for the same recipient. It carries the first event's
+    # id; the ids of every event it covers go out in the digest_of attribute.
+    lines = [f"- {event['subject']}: {event['message']}" for event in events]
+    return {
+        'event_id': events[0]['event_id'],
+        'recipient': events[0]['recipient'],
+        'subject': f"Medtrack: {len(events)} updates",
+        'message': "\n".join([f"You have {len(events)} Medtrack updates:"] + lines),
+        'digest_of': ','.join(event['event_id'] for event in events),
+    }
+
+
+def publish_notifications(events):
+    # Sends up to 10 events in one PublishBatch call. Entry ids are positions in `events`, since
+    # event ids need not satisfy SNS's batch-entry id rules.
+    response = circuit_breakers[SNS_CIRCUIT].call(
+        sns_client.publish_batch,
+        TopicArn=SNS_TOPIC_ARN,
+        PublishBatchRequestEntries=[
+            {
+                'Id': str(position),
+                'Message': event['message'],
+                'Subject': event['subject'],
+                'MessageAttributes': notification_attributes(event),
+            }
+            for position, event in enumerate(events)
+        ]
+    )
+    return {
+        events[int(failure['Id'])]['event_id']: RuntimeError(
+            f"{failure.get('Code')}: {failure.get('Message')} (sender fault: {failure.get('SenderFault')})"
+        )
+        for failure in response.get('Failed', [])
+    }
+
+
+notification_outbox = NotificationOutbox(
+    NOTIFICATION_OUTBOX_PATH,
+    publish_notifications,
+    max_backlog=NOTIFICATION_QUEUE_SIZE,
+    workers=NOTIFICATION_WORKERS,
+    lease_seconds=NOTIFICATION_LEASE_SECONDS,
+    retry_base_seconds=NOTIFICATION_RETRY_BASE_SECONDS,
+    retry_max_seconds=NOTIFICATION_RETRY_MAX_SECONDS,
+    poll_seconds=NOTIFICATION_POLL_SECONDS,
+    retention_seconds=NOTIFICATION_RETENTION_SECONDS,
+    batch_size=NOTIFICATION_BATCH_SIZE,
+    linger_seconds=NOTIFICATION_LINGER_SECONDS,
+    digest_window_seconds=NOTIFICATION_DIGEST_WINDOW_SECONDS,
+    digest_max_events=NOTIFICATION_DIGEST_MAX_EVENTS
+)
+atexit.register(notification_outbox.shutdown, timeout=NOTIFICATION_DRAIN_TIMEOUT)
+
+
+# --- Medication reminder dispatch ---
+# Fires a notification at every dose time of every active reminder. Each reminder holds a single
+# heap entry for its next dose; when that entry fires, the following dose is computed and pushed,
+# so memory stays at one small slotted object plus one heap tuple per reminder no matter how many
+# doses lie ahead. Removing or replacing a reminder bumps its version and the stale heap entry is
+# skipped when it surfaces. Dose notifications use a deterministic event id, so the outbox stores
+# each dose once even if two schedulers fire it.
+# Creations and deletions reach the scheduler through a change log rather than a reload, and each
+# reminder is read again just before its dose fires, so one deleted or deactivated in any process
+# never fires, whether or not the change has been seen yet. Doses that are due together are read
+# again and queued in batches, so a burst costs one storage round trip per batch, not per dose.
+REMINDER_INTERVAL_DAYS = {'every_other_day': 2, 'weekly': 7}
+
+
+class ScheduledReminder:
+    __slots__ = ('reminder_id', 'patient_email', 'medication', 'dosage', 'minutes', 'interval_days',
+                 'start', 'end', 'version')
+
+    def __init__(self, reminder, version):
+        self.reminder_id = reminder['reminder_id']
+        self.patient_email = reminder['patient_email']
+        self.medication = reminder['medication']
+        self.dosage = reminder['dosage']
+        # Dose times as minutes after midnight, e.g. '08:30' -> 510.
+        self.minutes = tuple(sorted({int(t[:2]) * 60 + int(t[3:5]) for t in reminder.get('times') or [] if t}))
+        self.interval_days = REMINDER_INTERVAL_DAYS.get(reminder.get('frequency'), 1)
+        self.start = datetime.strptime(reminder['date'], '%Y-%m-%d').date()
+        self.end = datetime.strptime(reminder['end_date'], '%Y-%m-%d').date() if reminder.get('end_date') else None
+        self.version = version
+
+    def next_dose_after(self, moment):
+        day = max(moment.date(), self.start)
+        for offset in range(self.interval_days + 1):
+            candidate_day = day + timedelta(days=offset)
+            if self.end and candidate_day > self.end:
+                return None
+            if (candidate_day - self.start).days % self.interval_days:
+                continue
+            for minutes in self.minutes:
+                candidate = datetime.combine(candidate_day, datetime.min.time()) + timedelta(minutes=minutes)
+                if candidate > moment:
+                    return candidate
+        return None
+
+
+class ReminderChangeLog:
+    # Ids of created and deleted reminders, in order, in a SQLite file shared by the processes on
+    # one host. Every scheduler reads it from its own position, so entries are only purged once they
+    # are older than `retention_seconds` (by then a full reload has covered them).
+    def __init__(self, path, retention_seconds):
+        self.path = path
+        self._retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self._create_schema()
+
+    def record(self, reminder_id):
+        self._connection().execute(
+            'INSERT INTO reminder_changes (reminder_id, changed_at) VALUES (?, ?)', (reminder_id, time.time())
+        )
+
+    def last_seq(self):
+        return self._connection().execute('SELECT COALESCE(MAX(seq), 0) FROM reminder_changes').fetchone()[0]
+
+    def since(self, seq, limit=1000):
+        # [(seq, reminder_id)] of the changes after `seq`, oldest first.
+        return self._connection().execute(
+            'SELECT seq, reminder_id FROM reminder_changes WHERE seq > ? ORDER BY seq LIMIT ?', (seq, limit)
+        ).fetchall()
+
+    def purge(self):
+        now = time.time()
+        if now - self._last_purge < self._retention_seconds / 10:
+            return
+        self._last_purge = now
+        self._connection().execute('DELETE FROM reminder_changes WHERE changed_at < ?', (now - self._retention_seconds,))
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS reminder_changes ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, reminder_id TEXT NOT NULL, changed_at REAL NOT NULL)'
+        )
+
+
+class ReminderScheduler:
+    # load_reminders() yields every active reminder, load_reminders_by_id(ids) returns {id: reminder}
+    # for those that still exist and notify(doses) queues [(ScheduledReminder, due datetime)].
+    def __init__(self, load_reminders, load_reminders_by_id, notify, changes, poll_seconds, batch_size=100):
+        self._load_reminders = load_reminders
+        self._load_reminders_by_id = load_reminders_by_id
+        self._notify = notify
+        self._changes = changes
+        self._poll_seconds = poll_seconds
+        self._batch_size = batch_size
+        self._change_seq = 0
+        self._condition = threading.Condition()
+        self._reminders = {}
+        self._heap = []
+        self._versions = 0
+        self._thread = None
+        self._stopping = False
+        self._fired = 0
+        self._skipped = 0
+        self._changes_applied = 0
+
+    def start(self):
+        if self._thread:
+            return
+        with self._condition:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+    def reload(self):
+        # Rebuilds the whole schedule from storage; the swap happens under the lock, the reading does not.
+        # Changes logged from here on are applied afterwards, so none made during the load are lost.
+        change_seq = self._changes.last_seq()
+        reminders = {}
+        heap = []
+        now = datetime.now()
+        for reminder in self._load_reminders():
+            scheduled = self._schedule(reminder, now)
+            if scheduled:
+                reminders[scheduled[0].reminder_id] = scheduled[0]
+                heap.append(scheduled[1])
+        heapq.heapify(heap)
+        with self._condition:
+            self._reminders = reminders
+            self._heap = heap
+            self._change_seq = max(self._change_seq, change_seq)
+            self._condition.notify_all()
+        logger.info(f"Reminder scheduler loaded {len(reminders)} active reminders.")
+
+    def add(self, reminder):
+        # Called when a reminder is created or changed; does nothing until the scheduler runs.
+        if not self._thread:
+            return
+        scheduled = self._schedule(reminder, datetime.now())
+        with self._condition:
+            if scheduled:
+                self._reminders[scheduled[0].reminder_id] = scheduled[0]
+                heapq.heappush(self._heap, scheduled[1])
+            else:
+                self._reminders.pop(reminder['reminder_id'], None)
+            self._condition.notify_all()
+
+    def remove(self, reminder_id, version=None):
+        # With a version, only that schedule is dropped, not one added since.
+        with self._condition:
+            scheduled = self._reminders.get(reminder_id)
+            if scheduled is not None and (version is None or scheduled.version == version):
+                del self._reminders[reminder_id]
+
+    def apply_changes(self):
+        # Brings the schedule up to date with the change log, reading each changed reminder once.
+        while True:
+            changes = self._changes.since(self._change_seq)
+            if not changes:
+                break
+            current = self._load_reminders_by_id([reminder_id for _, reminder_id in changes])
+            for _, reminder_id in changes:
+                if reminder_id in current:
+                    self.add(current[reminder_id])
+                else:
+                    self.remove(reminder_id)
+            with self._condition:
+                self._change_seq = changes[-1][0]
+                self._changes_applied += len(changes)
+        self._changes.purge()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'running': bool(self._thread),
+                'active_reminders': len(self._reminders),
+                'heap_entries': len(self._heap),
+                'fired': self._fired,
+                'skipped_inactive': self._skipped,
+                'changes_applied': self._changes_applied,
+                'next_dose_at': datetime.fromtimestamp(self._heap[0][0]).isoformat() if self._heap else None,
+            }
+
+    def _schedule(self, reminder, now):
+        if not reminder.get('is_active'):
+            return None
+        try:
+            with self._condition:
+                self._versions += 1
+                version = self._versions
+            scheduled = ScheduledReminder(reminder, version)
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Skipping reminder {reminder.get('reminder_id')} with an unreadable schedule: {e}")
+            return None
+        next_dose = scheduled.next_dose_after(now)
+        if next_dose is None:
+            return None
+        return scheduled, (next_dose.timestamp(), version, scheduled.reminder_id)
+
+    def _run(self):
+        try:
+            self.reload()
+        except Exception as e:
+            logger.error(f"Reminder scheduler failed to load reminders: {e}")
+        next_poll = time.monotonic() + self._poll_seconds
+        while True:
+            if time.monotonic() >= next_poll:
+                try:
+                    self.apply_changes()
+                except Exception as e:
+                    logger.error(f"Reminder scheduler failed to apply reminder changes: {e}")
+                next_poll = time.monotonic() + self._poll_seconds
+            with self._condition:
+                if self._stopping:
+                    return
+                poll_delay = max(0.0, next_poll - time.monotonic())
+                if not self._heap:
+                    self._condition.wait(poll_delay)
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._condition.wait(min(delay, poll_delay))
+                    continue
+                doses = self._pop_due(time.time())
+            if doses:
+                self._dispatch(doses)
+
+    def _pop_due(self, now):
+        # Takes up to batch_size due doses off the heap (under the lock), pushing each reminder's
+        # following dose.
+        doses = []
+        while self._heap and self._heap[0][0] <= now and len(doses) < self._batch_size:
+            due, version, reminder_id = heapq.heappop(self._heap)
+            scheduled = self._reminders.get(reminder_id)
+            if scheduled is None or scheduled.version != version:
+                continue
+            due = datetime.fromtimestamp(due)
+            next_dose = scheduled.next_dose_after(due)
+            if next_dose is None:
+                del self._reminders[reminder_id]
+            else:
+                heapq.heappush(self._heap, (next_dose.timestamp(), version, reminder_id))
+            doses.append((scheduled, due))
+        return doses
+
+    def _dispatch(self, doses):
+        try:
+            current = self._load_reminders_by_id([scheduled.reminder_id for scheduled, _ in doses])
+            active = []
+            for scheduled, due in doses:
+                reminder = current.get(scheduled.reminder_id)
+                if reminder and reminder.get('is_active'):
+                    active.append((scheduled, due))
+                else:
+                    self.remove(scheduled.reminder_id, scheduled.version)
+                    with self._condition:
+                        self._skipped += 1
+            if active:
+                self._notify(active)
+                with self._condition:
+                    self._fired += len(active)
+        except Exception as e:
+            logger.error(f"Failed to queue {len(doses)} dose notifications: {e}")
+
+
+def load_active_reminders():
+    if not isinstance(storage, DynamoDBStorage):
+        return (reminder for reminder in storage.scan(MEDICATION_REMINDERS_TABLE) if reminder.get('is_active'))
+    # On DynamoDB the table is read with a parallel scan, filtered to active reminders server-side.
+    scanner = ParallelScanner(storage.tables[MEDICATION_REMINDERS_TABLE],
+                              FilterExpression=boto3.dynamodb.conditions.Attr('is_active').eq(True))
+    pages = [[] for _ in range(scanner.total_segments)]
+    report = scanner.run(lambda segment, items: pages[segment].extend(items))
+    logger.info(f"Reminder scheduler scanned {report['scanned']} active reminders in {report['seconds']}s.")
+    return itertools.chain.from_iterable(pages)
+
+
+def notify_doses_due(doses):
+    notification_outbox.enqueue_many([
+        {
+            'subject': "Medtrack Medication Reminder",
+            'message': f"Time to take {scheduled.medication} ({scheduled.dosage}), scheduled for {due:%H:%M}.",
+            'event_id': f"dose:{scheduled.reminder_id}:{int(due.timestamp())}",
+            'recipient': scheduled.patient_email,
+            'urgent': True,
+        }
+        for scheduled, due in doses
+    ])
+
+
+def load_reminders_by_id(reminder_ids):
+    return storage.get_many(MEDICATION_REMINDERS_TABLE, reminder_ids)
+
+
+reminder_changes = ReminderChangeLog(REMINDER_CHANGE_LOG_PATH, REMINDER_SCHEDULER_RELOAD_SECONDS)
+reminder_scheduler = ReminderScheduler(load_active_reminders, load_reminders_by_id, notify_doses_due,
+                                       reminder_changes, REMINDER_CHANGES_POLL_SECONDS,
+                                       batch_size=REMINDER_DISPATCH_BATCH_SIZE)
+
+
+def record_reminder_change(reminder_id):
+    # A lost entry only delays a new reminder until the next full reload: deleted ones are caught
+    # when their dose comes up.
+    try:
+        reminder_changes.record(reminder_id)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to log the change of reminder {reminder_id}: {e}")
+
+
+@app.cli.command('reminder-scheduler')
+@click.option('--reload-every', type=float, default=None,
+              help='Seconds between full reloads from storage (default REMINDER_SCHEDULER_RELOAD_SECONDS).')
+def reminder_scheduler_command(reload_every):
+    """Run the medication reminder dispatcher in the foreground."""
+    # Changes made on this host arrive through the change log; the periodic reload catches the rest.
+    reload_every = reload_every or REMINDER_SCHEDULER_RELOAD_SECONDS
+    notification_outbox.start()
+    reminder_scheduler.start()
+    try:
+        while True:
+            time.sleep(reload_every)
+            reminder_scheduler.reload()
+    except KeyboardInterrupt:
+        reminder_scheduler.stop()
+
+
+# --- JSON API ---
+# Versioned read-only endpoints for the dashboard data. Every user record carries a data_version
+# that mutations replace after writing, so a conditional GET whose If-None-Match still matches is
+# answered with 304 after a single user lookup, without querying the lists themselves.
+# Lists are paginated: a response carries next_cursor until the last page, and the client passes
+# it back as ?cursor= for the next one.
+API_PREFIX = '/api/v1'
+# Fields of a doctor's user record that the API exposes.
+DOCTOR_PUBLIC_FIELDS = ('email', 'name', 'specialization', 'location', 'medical_license')
+
+
+def touch_user_data(*emails):
+    # Call after the write it covers: a client that reads the old version then re-fetches at worst
+    # once more, never keeps stale data.
+    version = uuid.uuid4().hex
+    for email in {email for email in emails if email}:
+        try:
+            storage.update(USERS_TABLE, email, {'data_version': version})
+        except Exception as e:
+            logger.error(f"Error updating data version for {email}: {e}")
+
+
+def user_data_version(email):
+    # Users created before data_version existed get one on first use. It is written before the
+    # lists are read, so the data served is never older than the version it is tagged with.
+    user = storage.get(USERS_TABLE, email) or {}
+    version = user.get('data_version')
+    if not version:
+        version = uuid.uuid4().hex
+        storage.update(USERS_TABLE, email, {'data_version': version})
+    return version
+
+
+def make_etag(*parts):
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+
+def conditional_json(etag, load):
+    # 304 when the client already holds this representation; load() only runs otherwise.
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(load())
+    response.set_etag(etag)
+    # Clients may keep the response but must revalidate it on every use.
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def user_data_response(resource, load, *etag_parts):
+    # load(email) returns one page as (items, next_cursor).
+    email = session['user_email']
+
+    def body():
+        items, next_cursor = load(email)
+        return {resource: items, 'next_cursor': next_cursor}
+
+    try:
+        etag = make_etag(API_PREFIX, resource, email, user_data_version(email), request.query_string, *etag_parts)
+        return conditional_json(etag, body)
+    except ValueError as e:
+        logger.warning(f"Bad request for {resource} API: {e}")
+        return api_error('Invalid limit or cursor.', 400)
+    except Exception as e:
+        logger.error(f"Error serving {resource} API for {email}: {e}")
+        return api_error('Data is temporarily unavailable. Please try again later.', 503)
+
+
+def load_api_page(table_name, field, sort_key, value):
+    # The page of a user's list that the request's limit and cursor arguments ask for, oldest first.
+    limit = int(request.args.get('limit', API_PAGE_SIZE))
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {API_MAX_PAGE_SIZE}")
+    cursor = request.args.get('cursor')
+    reader = storage.query_page(table_name, field, value, sort_key, limit,
+                                cursor=decode_cursor(cursor) if cursor else None)
+    items = [serialize_doc(item) for item in reader]
+    return items, encode_cursor(reader.next_cursor) if reader.next_cursor else None
+
+
+def display_reminders(reminders, today):
+    # Reminders with today's rollover applied to the copies being shown, as the dashboard shows them.
+    for reminder in reminders:
+        roll_over_reminder(reminder, today)
+        yield reminder
+
+
+def load_api_reminders(patient_email, today):
+    reminders, next_cursor = load_api_page(MEDICATION_REMINDERS_TABLE, 'patient_email', 'date', patient_email)
+    for reminder in reminders:
+        roll_over_reminder(reminder, today)
+    return reminders, next_cursor
+
+
+# --- Live updates (server-sent events) ---
+# Mutation routes publish a small delta per affected user to an in-process bus, and every open
+# /events stream of that user receives it. Memory per connection is bounded by its queue: a
+# client that falls SSE_QUEUE_SIZE events behind loses the oldest ones and is told to resync.
+# Events only reach streams held by the process that published them. An idle stream costs a
+# thread, so serve thousands of them with a cooperative worker (e.g. gunicorn -k gevent).
+class Subscription:
+    __slots__ = ('user', 'overflowed', '_events', '_condition')
+
+    def __init__(self, user, queue_size):
+        self.user = user
+        self.overflowed = False
+        self._events = collections.deque(maxlen=queue_size)
+        self._condition = threading.Condition()
+
+    def put(self, event):
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self.overflowed = True
+            self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout):
+        # Waits up to `timeout` seconds and returns (events, overflowed), taking every queued event.
+        with self._condition:
+            if not self._events:
+                self._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            overflowed, self.overflowed = self.overflowed, False
+            return events, overflowed
+
+
+class EventBus:
+    def __init__(self, queue_size, max_subscribers):
+        self._queue_size = queue_size
+        self._max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._count = 0
+        self._stats = {'published': 0, 'delivered': 0, 'rejected_connections': 0}
+
+    def subscribe(self, user, limit=None):
+        # Returns None when the process already holds max_subscribers (or `limit`) streams.
+        limit = self._max_subscribers if limit is None else min(limit, self._max_subscribers)
+        with self._lock:
+            if self._count >= limit:
+                self._stats['rejected_connections'] += 1
+                return None
+            subscription = Subscription(user, self._queue_size)
+            self._subscribers.setdefault(user, set()).add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user]
+            self._count -= 1
+
+    def publish(self, user, event_type, data):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user, ()))
+            self._stats['published'] += 1
+            self._stats['delivered'] += len(subscriptions)
+        event = (event_type, data)
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, connections=self._count, users=len(self._subscribers))
+
+
+event_bus = EventBus(SSE_QUEUE_SIZE, SSE_MAX_CONNECTIONS)
+
+
+def sse_connection_limit():
+    # Checked per connection rather than at import: gunicorn's gevent worker patches the standard
+    # library after a preloaded app has been imported.
+    monkey = sys.modules.get('gevent.monkey')
+    if monkey is not None and monkey.is_module_patched('socket'):
+        return SSE_MAX_CONNECTIONS
+    return min(SSE_MAX_CONNECTIONS, SSE_THREADED_MAX_CONNECTIONS)
+
+
+def publish_change(event_type, data, *emails):
+    # Records a change to these users' data for API clients (data_version) and pushes it to their
+    # open dashboards. Call last, after the write and after its notification is queued: the change
+    # has been made by then, so a failure here is logged rather than failing the request, and
+    # clients that miss it catch up on their next full read.
+    try:
+        touch_user_data(*emails)
+        for email in {email for email in emails if email}:
+            event_bus.publish(email, event_type, data)
+    except Exception as e:
+        logger.error(f"Error publishing {event_type} change for {', '.join(filter(None, emails))}: {e}")
+
+
+def format_sse(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
 # --- Helper function to prepare DynamoDB items for Jinja2 templates ---
 def serialize_doc(item):
     if item:
@@ -62,6 +2392,831 @@ def serialize_doc(item):
         return new_item
     return None
 
+# --- Response compression ---
+# Content types worth compressing. Server-sent event streams are left alone so every event
+# reaches the client the moment it is written.
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+# Precompressed file extension per encoding, in order of preference.
+STATIC_ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+# A compressed response's strong ETag gets the encoding appended ("abc" -> "abc-gzip"), since it
+# is a different representation; the suffix is stripped from If-None-Match on the way back in and
+# put back on the ETag of the resulting 304.
+ENCODED_ETAG_SUFFIX = re.compile(r'-(?:br|gzip)"')
+
+
+class StreamCompressor:
+    # Incremental gzip or brotli compressor. Every chunk is flushed, so a streamed response
+    # reaches the client as it is produced rather than when the compressor's buffer fills.
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress, self._flush, self._finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            # wbits=31 writes a gzip header and trailer around the deflate stream.
+            compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._compress, self._flush, self._finish = (
+                compressor.compress, partial(compressor.flush, zlib.Z_SYNC_FLUSH), compressor.flush
+            )
+
+    def compress(self, data):
+        return self._compress(data) + self._flush()
+
+    def finish(self):
+        return self._finish()
+
+
+class CompressionMiddleware:
+    # WSGI middleware that compresses responses for clients sending a matching Accept-Encoding.
+    # Responses with an unknown length (streamed ones) are buffered only until min_size bytes
+    # have been produced, then compressed chunk by chunk; shorter ones go out as they are.
+    # Requests under static_url_path are answered from precompressed files when they exist.
+    def __init__(self, app, min_size, gzip_level, brotli_quality, static_folder=None,
+                 static_url_path=None, static_max_age=None):
+        self.app = app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.static_folder = static_folder
+        self.static_url_path = static_url_path
+        # SEND_FILE_MAX_AGE_DEFAULT may be given in seconds or as a timedelta.
+        if isinstance(static_max_age, timedelta):
+            static_max_age = int(static_max_age.total_seconds())
+        self.static_max_age = static_max_age
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+        self._lock = threading.Lock()
+        self._stats = {'compressed': 0, 'skipped': 0, 'static_precompressed': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def __call__(self, environ, start_response):
+        encoding = self._negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+        response = {}
+        if environ.get('HTTP_IF_NONE_MATCH'):
+            environ['HTTP_IF_NONE_MATCH'], stripped = ENCODED_ETAG_SUFFIX.subn('"', environ['HTTP_IF_NONE_MATCH'])
+            # The client holds an encoded representation, so a 304 must name that one.
+            response['encoded_etag'] = bool(stripped)
+
+        static_response = self._precompressed_static(environ)
+        if static_response is not None:
+            self._count('static_precompressed')
+            return static_response(environ, start_response)
+
+
+        def capture_start_response(status, headers, exc_info=None):
+            if exc_info and response.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'], response['headers'] = status, headers
+            return response.setdefault('written', []).append
+
+        return self._compress(self.app(environ, capture_start_response), response, start_response, encoding)
+
+    def stats(self):
+        with self._lock:
+            ratio = self._stats['bytes_out'] / self._stats['bytes_in'] if self._stats['bytes_in'] else None
+            return dict(self._stats, encodings=self.encodings, ratio=round(ratio, 3) if ratio else None)
+
+    def _negotiate(self, accept_encoding):
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_header(accept_encoding)
+        for encoding in self.encodings:
+            if accepted.quality(encoding) > 0:
+                return encoding
+        return None
+
+    def _compress(self, app_iter, response, start_response, encoding):
+        chunks = iter(app_iter)
+        try:
+            # written holds anything sent through the legacy write() callable.
+            pending = list(response.get('written', []))
+            if 'status' not in response:
+                # Apps may start the response on their first iteration rather than when called.
+                pending.extend(chunk for chunk in [next(chunks, b'')] if chunk)
+            status, headers = response['status'], response['headers']
+            if status.startswith('304') and response.get('encoded_etag'):
+                headers = self._encoded_headers(headers, encoding, content_encoding=False)
+
+            content_length = self._content_length(headers)
+            too_small = content_length is not None and content_length < self.min_size
+            if too_small or not self._should_compress(status, headers):
+                self._count('skipped')
+                response['started'] = True
+                start_response(status, headers)
+                yield from pending
+                yield from chunks
+                return
+
+            if content_length is None:
+                size = sum(len(chunk) for chunk in pending)
+                while size < self.min_size:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        # The whole body turned out to be too small to be worth compressing.
+                        self._count('skipped')
+                        response['started'] = True
+                        start_response(status, self._with_content_length(headers, size))
+                        yield from pending
+                        return
+                    pending.append(chunk)
+                    size += len(chunk)
+
+            compressor = StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+            response['started'] = True
+            start_response(status, self._encoded_headers(headers, encoding))
+            bytes_in = bytes_out = 0
+            for chunk in itertools.chain(pending, chunks):
+                if chunk:
+                    data = compressor.compress(chunk)
+                    bytes_in += len(chunk)
+                    bytes_out += len(data)
+                    yield data
+            data = compressor.finish()
+            # Counted before the last yield: servers may close the generator once it is consumed.
+            with self._lock:
+                self._stats['compressed'] += 1
+                self._stats['bytes_in'] += bytes_in
+                self._stats['bytes_out'] += bytes_out + len(data)
+            yield data
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    def _should_compress(self, status, headers):
+        if not status.startswith('200'):
+            return False
+        header_map = {name.lower(): value for name, value in headers}
+        content_type = header_map.get('content-type', '').split(';')[0].strip().lower()
+        return (
+            'content-encoding' not in header_map
+            and 'no-transform' not in header_map.get('cache-control', '').lower()
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+            and not content_type.startswith(UNCOMPRESSED_TYPES)
+        )
+
+    def _content_length(self, headers):
+        for name, value in headers:
+            if name.lower() == 'content-length':
+                return int(value)
+        return None
+
+    def _with_content_length(self, headers, size):
+        return [(name, value) for name, value in headers if name.lower() != 'content-length'] + [
+            ('Content-Length', str(size))
+        ]
+
+    def _encoded_headers(self, headers, encoding, content_encoding=True):
+        encoded = []
+        vary = None
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == 'content-length':
+                continue
+            if lowered == 'vary':
+                vary = value
+                continue
+            if lowered == 'etag' and not value.startswith('W/') and value.endswith('"'):
+                value = f'{value[:-1]}-{encoding}"'
+            encoded.append((name, value))
+        if vary is None:
+            vary = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            vary = f'{vary}, Accept-Encoding'
+        if content_encoding:
+            encoded.append(('Content-Encoding', encoding))
+        encoded.append(('Vary', vary))
+        return encoded
+
+    def _precompressed_static(self, environ):
+        if not self.static_folder or not self.static_url_path:
+            return None
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.static_url_path + '/'):
+            return None
+        filename = safe_join(self.static_folder, path[len(self.static_url_path) + 1:])
+        if filename is None or not os.path.isfile(filename):
+            return None
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding in self.encodings:
+            compressed = filename + STATIC_ENCODINGS[encoding]
+            if accepted.quality(encoding) <= 0 or not os.path.isfile(compressed):
+                continue
+            stat = os.stat(compressed)
+            # A copy older than its source is stale; Flask serves the source until it is rebuilt.
+            if stat.st_mtime < os.stat(filename).st_mtime:
+                continue
+            response = Response(
+                wrap_file(environ, open(compressed, 'rb')),
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                direct_passthrough=True
+            )
+            response.headers['Content-Encoding'] = encoding
+            response.headers['Content-Length'] = str(stat.st_size)
+            response.vary.add('Accept-Encoding')
+            response.last_modified = stat.st_mtime
+            response.set_etag(f'{encoding}-{stat.st_mtime_ns:x}-{stat.st_size:x}')
+            if self.static_max_age:
+                response.cache_control.public = True
+                response.cache_control.max_age = self.static_max_age
+            else:
+                response.cache_control.no_cache = True
+            return response.make_conditional(environ)
+        return None
+
+    def _count(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+
+def compress_static_files(static_folder, min_size):
+    # Writes a .gz (and, with brotli installed, a .br) copy next to every compressible static file
+    # of at least min_size bytes whose copy is missing or older than the file.
+    written = []
+    for directory, _, filenames in os.walk(static_folder):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if filename.endswith(tuple(STATIC_ENCODINGS.values())):
+                continue
+            content_type = mimetypes.guess_type(filename)[0] or ''
+            if not content_type.startswith(COMPRESSIBLE_TYPES) or os.path.getsize(path) < min_size:
+                continue
+            with open(path, 'rb') as source:
+                data = source.read()
+            for encoding, extension in STATIC_ENCODINGS.items():
+                if encoding == 'br' and brotli is None:
+                    continue
+                target = path + extension
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                if encoding == 'br':
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    # mtime=0 keeps the output identical across builds.
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(compressed) >= len(data):
+                    continue
+                with open(target, 'wb') as output:
+                    output.write(compressed)
+                written.append((target, len(data), len(compressed)))
+    return written
+
+
+@app.cli.command('compress-static')
+def compress_static_command():
+    """Write precompressed .gz/.br copies of the static files."""
+    if not app.static_folder or not os.path.isdir(app.static_folder):
+        click.echo("No static folder to compress.")
+        return
+    written = compress_static_files(app.static_folder, COMPRESSION_MIN_SIZE)
+    for target, size, compressed_size in written:
+        click.echo(f"{target}: {size} -> {compressed_size} bytes")
+    click.echo(f"Wrote {len(written)} compressed files.")
+
+
+compression_middleware = CompressionMiddleware(
+    app.wsgi_app,
+    min_size=COMPRESSION_MIN_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
+    static_folder=app.static_folder,
+    static_url_path=app.static_url_path,
+    static_max_age=app.config['SEND_FILE_MAX_AGE_DEFAULT']
+)
+app.wsgi_app = compression_middleware
+
+
+# --- Template bytecode cache and timings ---
+# Only the first worker to load a template after a deploy compiles it; the others (and later
+# restarts) load the bytecode it wrote. Jinja writes cache files atomically, so workers may share
+# the directory.
+def private_cache_dir(path):
+    # Creates `path` for this user only, or checks that an existing one is: anyone else who can write
+    # to it could plant bytecode for the app to run. Returns False when it must not be used.
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+    except OSError as e:
+        logger.warning(f"Template bytecode cache {path} is unusable: {e}")
+        return False
+    if not stat.S_ISDIR(info.st_mode):
+        logger.warning(f"Template bytecode cache {path} is not a directory; the cache is disabled.")
+        return False
+    if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) != 0o700):
+        logger.warning(f"Template bytecode cache {path} must be owned by uid {os.getuid()} with mode 0700 "
+                       f"(found uid {info.st_uid}, mode {stat.S_IMODE(info.st_mode):o}); the cache is disabled.")
+        return False
+    return True
+
+
+if JINJA_BYTECODE_CACHE_DIR is None:
+    # Jinja's default directory is per user, created with mode 0700 and checked for ownership.
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+elif JINJA_BYTECODE_CACHE_DIR and private_cache_dir(JINJA_BYTECODE_CACHE_DIR):
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_BYTECODE_CACHE_DIR)
+
+
+class TemplateTimings:
+    # Per-template load (compile or bytecode cache) time from warm_up() and render counts and
+    # times from Flask's template signals, which fire around render_template and stream_template.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._templates = {}
+
+    def connect(self, flask_app):
+        before_render_template.connect(self._before_render, flask_app)
+        template_rendered.connect(self._after_render, flask_app)
+
+    def warm_up(self, environment):
+        # Loads every template so none is compiled on a user's request. Returns {name: seconds}.
+        loaded = {}
+        for name in environment.list_templates():
+            started = time.perf_counter()
+            try:
+                environment.get_template(name)
+            except Exception as e:
+                logger.error(f"Failed to compile template {name}: {e}")
+                continue
+            loaded[name] = time.perf_counter() - started
+            with self._lock:
+                self._entry(name)['load_seconds'] = round(loaded[name], 6)
+        return loaded
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for name, entry in self._templates.items():
+                renders = entry['renders']
+                stats[name] = {
+                    'load_seconds': entry['load_seconds'],
+                    'renders': renders,
+                    'render_seconds_avg': round(entry['render_seconds_total'] / renders, 6) if renders else 0.0,
+                    'render_seconds_max': round(entry['render_seconds_max'], 6),
+                }
+            return stats
+
+    def _before_render(self, sender, template, context, **extra):
+        # Renders do not nest within a thread, so one slot per thread is enough; a render that
+        # raises simply leaves its slot to be overwritten.
+        self._local.current = (id(context), time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        current = getattr(self._local, 'current', None)
+        if current is None or current[0] != id(context):
+            return
+        self._local.current = None
+        elapsed = time.perf_counter() - current[1]
+        with self._lock:
+            entry = self._entry(template.name)
+            entry['renders'] += 1
+            entry['render_seconds_total'] += elapsed
+            entry['render_seconds_max'] = max(entry['render_seconds_max'], elapsed)
+
+    def _entry(self, name):
+        if name not in self._templates:
+            self._templates[name] = {'load_seconds': None, 'renders': 0, 'render_seconds_total': 0.0,
+                                     'render_seconds_max': 0.0}
+        return self._templates[name]
+
+
+template_timings = TemplateTimings()
+template_timings.connect(app)
+if TEMPLATE_WARMUP:
+    warmed = template_timings.warm_up(app.jinja_env)
+    logger.info(f"Warmed up {len(warmed)} templates in {sum(warmed.values()):.3f}s.")
+
+
+@app.cli.command('warm-templates')
+def warm_templates_command():
+    """Compile every template into the bytecode cache and print how long each took."""
+    # Drop the templates warmed up at import so each one is really loaded again.
+    if app.jinja_env.cache is not None:
+        app.jinja_env.cache.clear()
+    for name, seconds in sorted(template_timings.warm_up(app.jinja_env).items()):
+        click.echo(f"{name}: {seconds * 1000:.1f} ms")
+
+
+# --- Password hashing ---
+class PasswordHashingBusy(Exception):
+    pass
+
+
+def calibrate_password_iterations(target_seconds, min_iterations, probe_iterations=20000, rounds=3):
+    # Times a short PBKDF2 run (best of `rounds`) and scales it to the target, in steps of 1000.
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac('sha256', b'calibration', b'salt', probe_iterations)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    iterations = int(probe_iterations * target_seconds / max(best, 1e-6)) // 1000 * 1000
+    return max(min_iterations, iterations)
+
+
+class PasswordHasher:
+    # Hashes and checks passwords on a bounded pool of threads. PBKDF2 releases the GIL, so at
+    # most `workers` hashes use CPU at once and the request threads stay responsive; when
+    # `max_pending` hashes are already queued or running, or a hash would outlast the request's
+    # deadline, PasswordHashingBusy is raised instead of queueing more work.
+    # PBKDF2 hashes made with a weaker digest or fewer than `rehash_below` of the current iterations
+    # are upgraded on the next login, so a host that calibrates slightly differently does not keep
+    # rewriting them. scrypt hashes are kept: replacing them with PBKDF2 would weaken them.
+    def __init__(self, iterations, workers, max_pending, rehash_below=0.75):
+        self.iterations = iterations
+        self.method = f'pbkdf2:sha256:{iterations}'
+        self._rehash_iterations = int(iterations * rehash_below)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        # Checked against when the email is unknown, so a login takes as long either way.
+        self._dummy_hash = generate_password_hash(secrets.token_urlsafe(16), method=self.method)
+        self._stats = {
+            'hashed': 0,
+            'verified': 0,
+            'rejected': 0,
+            'migrated_plaintext': 0,
+            'rehashed': 0,
+            'busy': 0,
+            'runs': 0,
+            'seconds_total': 0.0,
+            'seconds_max': 0.0,
+        }
+
+    def hash(self, password):
+        self._count('hashed')
+        return self._run(generate_password_hash, password, method=self.method)
+
+    def verify(self, stored, password):
+        # Returns (matches, new_hash). new_hash is set when the password matched but the stored
+        # value should be replaced: it was still plaintext or was hashed with a weaker setting.
+        if stored is None:
+            self._run(check_password_hash, self._dummy_hash, password)
+            self._count('rejected')
+            return False, None
+        if not self._is_hash(stored):
+            # Records from before passwords were hashed hold the password itself.
+            if not hmac.compare_digest(stored.encode(), password.encode()):
+                self._count('rejected')
+                return False, None
+            self._count('migrated_plaintext')
+            return True, self.hash(password)
+        if not self._run(check_password_hash, stored, password):
+            self._count('rejected')
+            return False, None
+        self._count('verified')
+        if self._needs_rehash(stored):
+            self._count('rehashed')
+            return True, self.hash(password)
+        return True, None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['seconds_avg'] = round(stats.pop('seconds_total') / (stats['runs'] or 1), 4)
+        stats['iterations'] = self.iterations
+        return stats
+
+    def _run(self, function, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            self._count('busy')
+            raise PasswordHashingBusy("Too many password hashes are pending.")
+        future = self._pool.submit(self._timed, function, *args, **kwargs)
+        future.add_done_callback(lambda _: self._slots.release())
+        budget = remaining_budget()
+        try:
+            return future.result(timeout=None if budget is None else max(0.0, budget))
+        except FutureTimeoutError:
+            self._count('busy')
+            raise PasswordHashingBusy("Password hashing did not finish before the request deadline.") from None
+
+    def _timed(self, function, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._stats['runs'] += 1
+                self._stats['seconds_total'] += elapsed
+                self._stats['seconds_max'] = max(self._stats['seconds_max'], round(elapsed, 4))
+
+    def _is_hash(self, stored):
+        return stored.startswith(('pbkdf2:', 'scrypt:')) and stored.count('$') == 2
+
+    def _needs_rehash(self, stored):
+        method = stored.split('$', 1)[0].split(':')
+        if method[0] != 'pbkdf2':
+            return False
+        if len(method) < 2 or method[1] not in ('sha256', 'sha384', 'sha512'):
+            return True
+        try:
+            return int(method[2]) < self._rehash_iterations
+        except (IndexError, ValueError):
+            return True
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+password_hash_iterations = PASSWORD_HASH_ITERATIONS or calibrate_password_iterations(
+    PASSWORD_HASH_TARGET_SECONDS, PASSWORD_HASH_MIN_ITERATIONS
+)
+password_hasher = PasswordHasher(password_hash_iterations, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+if password_hash_iterations < PASSWORD_HASH_MIN_ITERATIONS:
+    logger.warning(f"PASSWORD_HASH_ITERATIONS={password_hash_iterations} is below the minimum of "
+                   f"{PASSWORD_HASH_MIN_ITERATIONS}; only use it for tests.")
+logger.info(f"Hashing passwords with {password_hash_iterations} PBKDF2 iterations.")
+
+
+# --- Server-side sessions ---
+# With a server-side store the cookie only carries a random session id, signed with the app's
+# secret keys, so it stays small however much is flashed and is not re-signed on every response.
+# Session data is written back only when a request changed it.
+class LRUCache:
+    def __init__(self, capacity):
+        self._capacity = capacity
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def pop(self, key):
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def remove_if(self, predicate):
+        with self._lock:
+            keys = [key for key, value in self._entries.items() if predicate(value)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=len(self._entries), capacity=self._capacity)
+
+
+class MemorySessionStore:
+    # Sessions of this process only, {sid: (data, expires_at)}. When the cache is full the least
+    # recently used session is dropped, which signs that user out.
+    def __init__(self, cache_size):
+        self._cache = LRUCache(cache_size)
+
+    def load(self, sid):
+        # Returns (data, expires_at), or None for an unknown or expired session.
+        entry = self._cache.get(sid)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return copy.deepcopy(entry[0]), entry[1]
+
+    def save(self, sid, data, expires_at):
+        self._cache.put(sid, (copy.deepcopy(data), expires_at))
+
+    def touch(self, sid, expires_at):
+        entry = self._cache.get(sid)
+        if entry is not None:
+            self._cache.put(sid, (entry[0], expires_at))
+
+    def delete(self, sid):
+        self._cache.pop(sid)
+
+    def sweep(self):
+        now = time.time()
+        return self._cache.remove_if(lambda entry: entry[1] <= now)
+
+    def stats(self):
+        return {'backend': 'memory', 'cache': self._cache.stats()}
+
+
+class SQLiteSessionStore:
+    # Sessions shared by the workers on one host. Each process caches decoded sessions by version:
+    # a load reads only the row's version and expiry unless the session changed since it was
+    # cached, so a write or sign-out in one worker is seen by all the others.
+    def __init__(self, path, cache_size):
+        self.path = path
+        self._local = threading.local()
+        self._cache = LRUCache(cache_size)
+        self._serializer = TaggedJSONSerializer()
+        self._create_schema()
+
+    def load(self, sid):
+        connection = self._connection()
+        row = connection.execute('SELECT version, expires_at FROM sessions WHERE sid = ?', (sid,)).fetchone()
+        if row is None or row[1] <= time.time():
+            self._cache.pop(sid)
+            return None
+        version, expires_at = row
+        cached = self._cache.get(sid)
+        if cached is not None and cached[0] == version:
+            return copy.deepcopy(cached[1]), expires_at
+        row = connection.execute('SELECT data FROM sessions WHERE sid = ? AND version = ?', (sid, version)).fetchone()
+        if row is None:
+            return None
+        data = self._serializer.loads(row[0])
+        self._cache.put(sid, (version, data))
+        return copy.deepcopy(data), expires_at
+
+    def save(self, sid, data, expires_at):
+        version = uuid.uuid4().hex
+        self._connection().execute(
+            'INSERT OR REPLACE INTO sessions (sid, data, version, expires_at) VALUES (?, ?, ?, ?)',
+            (sid, self._serializer.dumps(data), version, expires_at)
+        )
+        self._cache.put(sid, (version, copy.deepcopy(data)))
+
+    def touch(self, sid, expires_at):
+        self._connection().execute('UPDATE sessions SET expires_at = ? WHERE sid = ?', (expires_at, sid))
+
+    def delete(self, sid):
+        self._connection().execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+        self._cache.pop(sid)
+
+    def sweep(self):
+        # Cached copies of swept sessions are never served: a load checks the row first.
+        return self._connection().execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+
+    def stats(self):
+        return {'backend': 'sqlite', 'cache': self._cache.stats()}
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'sid TEXT PRIMARY KEY, data TEXT NOT NULL, version TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)')
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.modified = False
+        self.replaced_sid = None
+
+    def regenerate(self):
+        # Called when privileges change (login, logout): the next save stores the data under a new
+        # id and deletes the old row, so an id planted in a browser before login is worth nothing.
+        if self.sid is not None:
+            self.replaced_sid = self.replaced_sid or self.sid
+            self.sid = None
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    def __init__(self, store, ttl_seconds, sweep_seconds):
+        self.store = store
+        self._ttl_seconds = ttl_seconds
+        self._sweep_seconds = sweep_seconds
+        self._last_sweep = time.time()
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'saved': 0, 'touched': 0, 'deleted': 0, 'regenerated': 0, 'swept': 0,
+                       'invalid_cookies': 0}
+
+    def open_session(self, app, request):
+        signer = self._signer(app)
+        if signer is None:
+            return None
+        token = request.cookies.get(self.get_cookie_name(app))
+        if token:
+            try:
+                sid = signer.unsign(token).decode()
+            except BadSignature:
+                self._count('invalid_cookies')
+            else:
+                loaded = self.store.load(sid)
+                if loaded is not None:
+                    return ServerSideSession(loaded[0], sid=sid, expires_at=loaded[1])
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        response.vary.add('Cookie')
+
+        if session.replaced_sid is not None:
+            self.store.delete(session.replaced_sid)
+            self._count('regenerated')
+
+        if not session:
+            # An emptied session is removed with its cookie; a new, empty one is never stored.
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                self._count('deleted')
+            if session.sid is not None or session.replaced_sid is not None:
+                response.delete_cookie(name, domain=domain, path=path, secure=self.get_cookie_secure(app),
+                                       partitioned=self.get_cookie_partitioned(app),
+                                       samesite=self.get_cookie_samesite(app), httponly=self.get_cookie_httponly(app))
+            return
+
+        now = time.time()
+        expires_at = now + self._ttl_seconds
+        new = session.sid is None
+        if new:
+            session.sid = secrets.token_urlsafe(32)
+            self._count('created')
+        if session.modified or new:
+            self.store.save(session.sid, dict(session), expires_at)
+            self._count('saved')
+        elif session.expires_at - now < self._ttl_seconds / 2:
+            # Sessions that are only read are kept alive, but at most one write per half TTL.
+            self.store.touch(session.sid, expires_at)
+            self._count('touched')
+        self._maybe_sweep(now)
+
+        # The session id only changes on regenerate(), so otherwise the cookie is only sent again to
+        # renew a permanent one.
+        if new or (session.permanent and app.config['SESSION_REFRESH_EACH_REQUEST']):
+            response.set_cookie(
+                name, self._signer(app).sign(session.sid).decode(),
+                expires=self.get_expiration_time(app, session), httponly=self.get_cookie_httponly(app),
+                domain=domain, path=path, secure=self.get_cookie_secure(app),
+                partitioned=self.get_cookie_partitioned(app), samesite=self.get_cookie_samesite(app)
+            )
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(self.store.stats())
+        return stats
+
+    def _signer(self, app):
+        # The last key signs; SECRET_KEY_FALLBACKS are still accepted, as for cookie sessions.
+        if not app.secret_key:
+            return None
+        keys = [*app.config['SECRET_KEY_FALLBACKS'], app.secret_key]
+        return Signer(keys, salt='medtrack-session-id', key_derivation='hmac', digest_method=hashlib.sha256)
+
+    def _maybe_sweep(self, now):
+        if now - self._last_sweep < self._sweep_seconds:
+            return
+        with self._lock:
+            if now - self._last_sweep < self._sweep_seconds:
+                return
+            self._last_sweep = now
+        swept = self.store.sweep()
+        self._count('swept', swept)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+
+def create_session_interface(backend):
+    if backend == 'cookie':
+        return None
+    if backend == 'memory':
+        store = MemorySessionStore(SESSION_CACHE_SIZE)
+    elif backend == 'sqlite':
+        store = SQLiteSessionStore(SESSION_SQLITE_PATH, SESSION_CACHE_SIZE)
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND {backend!r}; expected cookie, memory or sqlite.")
+    return ServerSideSessionInterface(store, SESSION_TTL_SECONDS, SESSION_SWEEP_SECONDS)
+
+
+server_session_interface = create_session_interface(SESSION_BACKEND)
+if server_session_interface is not None:
+    app.session_interface = server_session_interface
+
+
+def regenerate_session():
+    # Server-side sessions get a new id; signed cookie sessions carry no id that could be fixed.
+    regenerate = getattr(session, 'regenerate', None)
+    if regenerate is not None:
+        regenerate()
+
+
 # --- Flask Routes ---
 
 @app.route('/')
@@ -73,6 +3228,44 @@ def index():
             return redirect(url_for('doctor_dashboard'))
     return render_template('index.html')
 
+@app.before_request
+def start_background_workers():
+    # Starting here (rather than at import) keeps CLI commands from publishing, while still
+    # replaying notifications left in the outbox as soon as the app serves traffic.
+    notification_outbox.start()
+    if REMINDER_SCHEDULER_ENABLED:
+        reminder_scheduler.start()
+
+
+@app.before_request
+def start_request_deadline():
+    if REQUEST_DEADLINE_SECONDS > 0:
+        g.deadline_token = request_deadline.set(time.monotonic() + REQUEST_DEADLINE_SECONDS)
+
+
+@app.teardown_request
+def clear_request_deadline(error=None):
+    # The WSGI server reuses threads, so the deadline must not leak into the next request.
+    token = g.pop('deadline_token', None)
+    if token is not None:
+        request_deadline.reset(token)
+
+
+@app.route('/metrics')
+def metrics():
+    return jsonify({
+        'doctor_directory': doctor_directory.stats(),
+        'aws_connection_pools': aws_clients.stats(),
+        'notification_outbox': notification_outbox.stats(),
+        'reminder_scheduler': reminder_scheduler.stats(),
+        'circuit_breakers': {name: breaker.stats() for name, breaker in circuit_breakers.items()},
+        'compression': compression_middleware.stats(),
+        'templates': template_timings.stats(),
+        'live_updates': event_bus.stats(),
+        'sessions': server_session_interface.stats() if server_session_interface else {'backend': 'cookie'},
+        'password_hashing': password_hasher.stats(),
+    })
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -87,15 +3280,14 @@ def register():
             return redirect(url_for('register'))
 
         try:
-            response = USERS_TABLE.get_item(Key={'email': email})
-            if 'Item' in response:
+            if storage.get(USERS_TABLE, email):
                 flash('Email already registered. Please login or use a different email.', 'error')
                 return redirect(url_for('register'))
 
             new_user = {
                 'email': email,
                 'name': name,
-                'password': password,
+                'password': password_hasher.hash(password),
                 'user_type': user_type
             }
 
@@ -107,9 +3299,15 @@ def register():
                 new_user['age'] = request.form.get('age', '')
                 new_user['gender'] = request.form.get('gender', '')
 
-            USERS_TABLE.put_item(Item=new_user)
+            storage.put(USERS_TABLE, new_user)
+            if user_type == 'doctor':
+                doctor_directory.invalidate()
             flash('Account created successfully! Please login.', 'success')
             return redirect(url_for('login'))
+        except PasswordHashingBusy as e:
+            logger.warning(f"Registration turned away: {e}")
+            flash('The server is busy. Please try again in a moment.', 'error')
+            return redirect(url_for('register'))
         except Exception as e:
             logger.error(f"Error during user registration in DynamoDB: {e}")
             flash('An error occurred during registration. Please try again.', 'error')
@@ -125,10 +3323,17 @@ def login():
         password = request.form['password']
 
         try:
-            response = USERS_TABLE.get_item(Key={'email': email})
-            user = response.get('Item')
+            user = storage.get(USERS_TABLE, email)
+            matches, new_hash = password_hasher.verify(user['password'] if user else None, password)
+            if matches and new_hash:
+                # Plaintext and outdated hashes are replaced as their owners log in.
+                try:
+                    storage.update(USERS_TABLE, email, {'password': new_hash})
+                except Exception as e:
+                    logger.error(f"Error updating the password hash of {email}: {e}")
 
-            if user and user['password'] == password:
+            if matches:
+                regenerate_session()
                 session['user_email'] = user['email']
                 session['username'] = user['name']
                 session['user_type'] = user['user_type']
@@ -140,6 +3345,10 @@ def login():
                     return redirect(url_for('doctor_dashboard'))
             else:
                 flash('Invalid email or password.', 'error')
+        except PasswordHashingBusy as e:
+            logger.warning(f"Login turned away: {e}")
+            flash('The server is busy. Please try again in a moment.', 'error')
+            return render_template('login.html'), 503
         except Exception as e:
             logger.error(f"Error during login from DynamoDB: {e}")
             flash('An error occurred during login. Please try again.', 'error')
@@ -148,6 +3357,7 @@ def login():
 
 @app.route('/logout')
 def logout():
+    regenerate_session()
     session.pop('user_email', None)
     session.pop('username', None)
     session.pop('user_type', None)
@@ -161,67 +3371,8 @@ def patient_dashboard():
         flash('Unauthorized access. Please login as a patient.', 'error')
         return redirect(url_for('login'))
 
-    patient_email = session['user_email']
-    patient_name = session['username']
-
-    user_appointments = []
-    user_reminders = []
-    user_prescriptions = []
-    doctors_from_db = []
-
-    try:
-        appointments_response = APPOINTMENTS_TABLE.scan(FilterExpression=boto3.dynamodb.conditions.Attr('patient_email').eq(patient_email))
-        user_appointments = [serialize_doc(apt) for apt in appointments_response.get('Items', [])]
-
-        reminders_response = MEDICATION_REMINDERS_TABLE.scan(FilterExpression=boto3.dynamodb.conditions.Attr('patient_email').eq(patient_email))
-        user_reminders = [serialize_doc(rem) for rem in reminders_response.get('Items', [])]
-
-        prescriptions_response = PRESCRIPTIONS_TABLE.scan(FilterExpression=boto3.dynamodb.conditions.Attr('patient_email').eq(patient_email))
-        user_prescriptions = [serialize_doc(pres) for pres in prescriptions_response.get('Items', [])]
-
-        doctors_response = USERS_TABLE.scan(FilterExpression=boto3.dynamodb.conditions.Attr('user_type').eq('doctor'))
-        for doc in doctors_response.get('Items', []):
-            doc['medical_license'] = doc.get('medical_license', 'N/A')
-            doctors_from_db.append(serialize_doc(doc))
-
-        today = datetime.now().strftime('%Y-%m-%d')
-        for reminder in user_reminders:
-            if reminder.get('date') < today and reminder.get('status') == 'Pending':
-                MEDICATION_REMINDERS_TABLE.update_item(
-                    Key={'reminder_id': reminder['reminder_id']},
-                    UpdateExpression="SET #s = :status",
-                    ExpressionAttributeNames={'#s': 'status'},
-                    ExpressionAttributeValues={':status': 'Missed'}
-                )
-                reminder['status'] = 'Missed'
-
-            if reminder.get('frequency') and 'daily' in reminder['frequency'] and reminder.get('last_checked_date') != today:
-                MEDICATION_REMINDERS_TABLE.update_item(
-                    Key={'reminder_id': reminder['reminder_id']},
-                    UpdateExpression="SET taken_today = :false, #s = :pending, last_checked_date = :today",
-                    ExpressionAttributeNames={'#s': 'status'},
-                    ExpressionAttributeValues={
-                        ':false': False,
-                        ':pending': 'Pending',
-                        ':today': today
-                    }
-                )
-                reminder['taken_today'] = False
-                reminder['status'] = 'Pending'
-                reminder['last_checked_date'] = today
-
-    except Exception as e:
-        logger.error(f"Error fetching patient dashboard data from DynamoDB: {e}")
-        flash('An error occurred while loading dashboard data. Please try again later.', 'error')
-
-    return render_template(
-        'patient_dashboard.html',
-        username=patient_name,
-        appointments=user_appointments,
-        doctors_data=doctors_from_db,
-        medication_reminders=user_reminders,
-        prescriptions=user_prescriptions
-    )
+    # Only the page shell is rendered here; each section fetches its own fragment when shown.
+    return stream_page('patient_dashboard.html', username=session['username'], live_updates=LIVE_UPDATES_ENABLED)
 
 
 @app.route('/doctor_dashboard')
@@ -230,27 +3381,173 @@ def doctor_dashboard():
         flash('Please log in to access the doctor dashboard.', 'error')
         return redirect(url_for('login'))
 
-    doctor_email = session['user_email']
-    doctor_name = session['username']
+    return stream_page('doctor_dashboard.html', username=session['username'], live_updates=LIVE_UPDATES_ENABLED)
 
-    doctor_appointments = []
-    doctor_prescriptions = []
 
+def stream_chunks(name, chunks, size):
+    # Joins the small strings a streamed template yields into chunks of about `size` characters.
+    # An error in the middle of a stream can no longer change the response status, so it is logged
+    # and the page ends with the usual error fragment rather than silently where it got to.
+    buffer, buffered = [], 0
+    try:
+        for chunk in chunks:
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= size:
+                yield ''.join(buffer)
+                buffer, buffered = [], 0
+    except Exception as e:
+        logger.error(f"Error while streaming {name}: {e}")
+        buffer.append(render_template('partials/fragment_error.html'))
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_page(template_name, **context):
+    # Renders a template into a streamed response: the head of the page goes out while the rest
+    # is still being rendered, and lazily read rows are never held in memory all at once.
+    # The session cookie is written before the body, so flashed messages are taken from the
+    # session now rather than by the template mid-stream.
+    get_flashed_messages(with_categories=True)
+    # stream_with_context keeps the request context for the error fragment once the template's
+    # own context has been torn down by the failure.
+    chunks = stream_chunks(template_name, stream_template(template_name, **context), STREAM_CHUNK_SIZE)
+    return app.response_class(stream_with_context(chunks))
+
+
+class LazyRows:
+    # Rows handed to a streamed template, read as the template loops over them. Truth-testing
+    # reads at most the first row, so `{% if rows %}` checks work without reading the rest.
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._head = []
+
+    def __bool__(self):
+        if not self._head:
+            self._head.extend(itertools.islice(self._rows, 1))
+        return bool(self._head)
+
+    def __iter__(self):
+        while self._head:
+            yield self._head.pop()
+        yield from self._rows
+
+
+class ListPage:
+    # Position of a paginated list for the sort and page links. The next page is only known once
+    # the page's reader has been iterated, i.e. after the template has rendered the rows.
+    def __init__(self, sort, descending, sorts, first, reader):
+        self.sort = sort
+        self.order = 'desc' if descending else 'asc'
+        self.sorts = list(sorts)
+        self.first = first
+        self._reader = reader
+
+    @property
+    def next_cursor(self):
+        next_cursor = self._reader.next_cursor
+        return encode_cursor(next_cursor) if next_cursor else None
+
+
+# Sort options of the paginated dashboard lists: option -> sort key of the index it reads.
+APPOINTMENT_SORTS = {'date': 'date', 'status': 'status'}
+PRESCRIPTION_SORTS = {'date': 'date_prescribed'}
+REMINDER_SORTS = {'date': 'date'}
+
+
+def encode_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    # Raises ValueError (or a subclass) for anything that is not a cursor we handed out.
+    return json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+
+
+def get_list_page(table_name, field, value, sorts):
+    # One page of a user's list as asked for by the request's sort, order and cursor arguments.
+    # Returns (rows, page): the rows are read as they are rendered, and page describes the
+    # position for the sort and page links.
+    sort = request.args.get('sort', 'date')
+    if sort not in sorts:
+        raise ValueError(f"Unknown sort {sort!r}")
+    descending = request.args.get('order') == 'desc'
+    cursor = request.args.get('cursor')
+    reader = storage.query_page(
+        table_name, field, value, sorts[sort], DASHBOARD_PAGE_SIZE,
+        cursor=decode_cursor(cursor) if cursor else None,
+        descending=descending
+    )
+    rows = LazyRows(serialize_doc(item) for item in reader)
+    # Reading the first row here makes the query fail, if it is going to, before any of the
+    # response has been sent.
+    bool(rows)
+    return rows, ListPage(sort, descending, sorts, not cursor, reader)
+
+
+def list_page_context(name, table_name, field, sorts):
+    # Loader for a paginated fragment: puts the page's items under `name` next to `page`.
+    def load(email):
+        items, page = get_list_page(table_name, field, email, sorts)
+        return {name: items, 'page': page}
+    return load
+
+
+def reminders_page_context(email):
+    items, page = get_list_page(MEDICATION_REMINDERS_TABLE, 'patient_email', email, REMINDER_SORTS)
+    return {'medication_reminders': LazyRows(display_reminders(items, datetime.now().strftime('%Y-%m-%d'))),
+            'page': page}
+
+
+# Dashboard section fragments: name -> (partial template, loader). Each loader takes the
+# signed-in user's email, issues only the read its own section needs and returns the template
+# context.
+PATIENT_FRAGMENTS = {
+    'appointments': ('partials/patient_appointments.html',
+                     list_page_context('appointments', APPOINTMENTS_TABLE, 'patient_email', APPOINTMENT_SORTS)),
+    'prescriptions': ('partials/patient_prescriptions.html',
+                      list_page_context('prescriptions', PRESCRIPTIONS_TABLE, 'patient_email', PRESCRIPTION_SORTS)),
+    # The stored reminders are rolled over by the 'flask rollover-reminders' job. Until it has run
+    # for today, the same rules are applied to the copies shown here without writing anything back.
+    'reminders': ('partials/patient_reminders.html', reminders_page_context),
+    'doctor_options': ('partials/doctor_options.html', lambda email: {'doctors_data': doctor_directory.get()}),
+    'doctors': ('partials/doctor_directory.html', lambda email: {'doctors_data': doctor_directory.get()}),
+}
+DOCTOR_FRAGMENTS = {
+    'appointments': ('partials/doctor_appointments.html',
+                     list_page_context('appointments', APPOINTMENTS_TABLE, 'doctor_email', APPOINTMENT_SORTS)),
+    'prescriptions': ('partials/doctor_prescriptions.html',
+                      list_page_context('prescriptions', PRESCRIPTIONS_TABLE, 'doctor_email', PRESCRIPTION_SORTS)),
+}
+
+
+def render_fragment(fragments, fragment):
+    if fragment not in fragments:
+        abort(404)
+    template, load = fragments[fragment]
     try:
-        appointments_response = APPOINTMENTS_TABLE.scan(FilterExpression=boto3.dynamodb.conditions.Attr('doctor_name').eq(doctor_name))
-        doctor_appointments = [serialize_doc(apt) for apt in appointments_response.get('Items', [])]
+        context = load(session['user_email'])
+    except ValueError as e:
+        logger.warning(f"Bad request for dashboard fragment {fragment}: {e}")
+        return render_template('partials/fragment_error.html'), 400
+    except Exception as e:
+        logger.error(f"Error fetching dashboard fragment {fragment} from DynamoDB: {e}")
+        return render_template('partials/fragment_error.html'), 503
+    return stream_page(template, **context)
 
-        prescriptions_response = PRESCRIPTIONS_TABLE.scan(FilterExpression=boto3.dynamodb.conditions.Attr('doctor_name').eq(doctor_name))
-        doctor_prescriptions = [serialize_doc(pres) for pres in prescriptions_response.get('Items', [])]
 
-    except Exception as e:
-        logger.error(f"Error fetching doctor dashboard data from DynamoDB: {e}")
-        flash('An error occurred while loading dashboard data. Please try again later.', 'error')
+@app.route('/patient_dashboard/<fragment>')
+def patient_dashboard_fragment(fragment):
+    if 'user_email' not in session or session['user_type'] != 'patient':
+        return '', 401
+    return render_fragment(PATIENT_FRAGMENTS, fragment)
 
-    return render_template('doctor_dashboard.html',
-                            username=doctor_name,
-                            appointments=doctor_appointments,
-                            prescriptions=doctor_prescriptions)
+
+@app.route('/doctor_dashboard/<fragment>')
+def doctor_dashboard_fragment(fragment):
+    if 'user_email' not in session or session['user_type'] != 'doctor':
+        return '', 401
+    return render_fragment(DOCTOR_FRAGMENTS, fragment)
 
 
 @app.route('/book_appointment', methods=['POST'])
@@ -262,32 +3559,44 @@ def book_appointment():
     patient_email = session['user_email']
     patient_name = session['username']
 
-    doctor_name = request.form['doctor_name']
+    doctor_email = request.form['doctor_email']
     appointment_date = request.form['appointment_date']
     appointment_time = request.form['appointment_time']
     reason = request.form['reason']
 
     try:
+        doctor_user = storage.get(USERS_TABLE, doctor_email)
+
+        if not doctor_user or doctor_user.get('user_type') != 'doctor':
+            flash('Selected doctor does not exist. Please choose a doctor from the list.', 'error')
+            return redirect(url_for('patient_dashboard', section='patient-book-appointment-section'))
+
+        doctor_name = doctor_user['name']
         new_appointment = {
             'appointment_id': str(uuid.uuid4()),
             'patient_email': patient_email,
             'patient_name': patient_name,
+            'doctor_email': doctor_email,
             'doctor_name': doctor_name,
             'date': appointment_date,
             'time': appointment_time,
             'reason': reason,
             'status': 'Pending'
         }
-        APPOINTMENTS_TABLE.put_item(Item=new_appointment)
-
+        storage.put(APPOINTMENTS_TABLE, new_appointment)
         message = (f"New appointment booked: Patient {patient_name} ({patient_email}) "
                    f"with Dr. {doctor_name} on {appointment_date} at {appointment_time} "
                    f"for reason: {reason}.")
-        try:
-            sns_client.publish(TopicArn=SNS_TOPIC_ARN, Message=message, Subject="New Medtrack Appointment")
-            logger.info(f"SNS notification sent for new appointment: {new_appointment['appointment_id']}.")
-        except Exception as sns_e:
-            logger.error(f"Failed to send SNS notification for appointment booking: {sns_e}")
+        notification_outbox.enqueue("New Medtrack Appointment", message, recipient=doctor_email,
+                                    urgent=appointment_date <= datetime.now().strftime('%Y-%m-%d'))
+        logger.info(f"SNS notification queued for new appointment: {new_appointment['appointment_id']}.")
+
+        publish_change('appointment', {
+            'action': 'booked',
+            'appointment_id': new_appointment['appointment_id'],
+            'status': 'Pending',
+            'message': f"New appointment: {patient_name} with Dr. {doctor_name} on {appointment_date} at {appointment_time}.",
+        }, patient_email, doctor_email)
 
         flash('Appointment booked successfully! Awaiting doctor\'s approval.', 'success')
         return redirect(url_for('patient_dashboard', section='patient-appointments-section'))
@@ -306,26 +3615,26 @@ def cancel_appointment(appointment_id):
     patient_email = session['user_email']
 
     try:
-        response = APPOINTMENTS_TABLE.get_item(Key={'appointment_id': appointment_id})
-        appointment = response.get('Item')
+        appointment = storage.get(APPOINTMENTS_TABLE, appointment_id)
 
         if appointment and appointment['patient_email'] == patient_email:
             if appointment['status'] not in ['Cancelled', 'Completed']:
-                APPOINTMENTS_TABLE.update_item(
-                    Key={'appointment_id': appointment_id},
-                    UpdateExpression="SET #s = :status",
-                    ExpressionAttributeNames={'#s': 'status'},
-                    ExpressionAttributeValues={':status': 'Cancelled'}
-                )
-
+                storage.update(APPOINTMENTS_TABLE, appointment_id, {'status': 'Cancelled'})
                 message = (f"Appointment cancelled: Patient {patient_email}'s appointment "
                            f"with Dr. {appointment['doctor_name']} on {appointment['date']} "
                            f"at {appointment['time']} has been cancelled.")
-                try:
-                    sns_client.publish(TopicArn=SNS_TOPIC_ARN, Message=message, Subject="Medtrack Appointment Cancelled")
-                    logger.info(f"SNS notification sent for appointment cancellation: {appointment_id}.")
-                except Exception as sns_e:
-                    logger.error(f"Failed to send SNS notification for cancellation: {sns_e}")
+                # A cancellation for today or earlier is time-sensitive, so it skips the digest.
+                notification_outbox.enqueue("Medtrack Appointment Cancelled", message,
+                                            recipient=appointment.get('doctor_email'),
+                                            urgent=appointment['date'] <= datetime.now().strftime('%Y-%m-%d'))
+                logger.info(f"SNS notification queued for appointment cancellation: {appointment_id}.")
+
+                publish_change('appointment', {
+                    'action': 'cancelled',
+                    'appointment_id': appointment_id,
+                    'status': 'Cancelled',
+                    'message': f"The appointment on {appointment['date']} at {appointment['time']} was cancelled.",
+                }, patient_email, appointment.get('doctor_email'))
 
                 flash('Appointment cancelled successfully.', 'success')
             else:
@@ -349,26 +3658,27 @@ def update_appointment_status():
     new_status = request.form['status']
 
     try:
-        response = APPOINTMENTS_TABLE.get_item(Key={'appointment_id': appointment_id})
-        appointment = response.get('Item')
-
-        if appointment and appointment['doctor_name'] == session['username']:
-            APPOINTMENTS_TABLE.update_item(
-                Key={'appointment_id': appointment_id},
-                UpdateExpression="SET #s = :status",
-                ExpressionAttributeNames={'#s': 'status'},
-                ExpressionAttributeValues={':status': new_status},
-                ReturnValues="UPDATED_NEW"
-            )
+        appointment = storage.get(APPOINTMENTS_TABLE, appointment_id)
+
+        # Appointments booked before doctor_email was recorded are matched on the doctor's name.
+        if appointment and (appointment.get('doctor_email') == session['user_email']
+                            or ('doctor_email' not in appointment and appointment['doctor_name'] == session['username'])):
+            storage.update(APPOINTMENTS_TABLE, appointment_id, {'status': new_status})
             flash(f'Appointment status updated to {new_status}.', 'success')
 
             message = (f"Your appointment with Dr. {appointment['doctor_name']} "
                        f"on {appointment['date']} at {appointment['time']} has been updated to: {new_status}.")
-            try:
-                sns_client.publish(TopicArn=SNS_TOPIC_ARN, Message=message, Subject="Medtrack Appointment Update")
-                logger.info(f"SNS notification sent for appointment status update: {appointment_id}.")
-            except Exception as sns_e:
-                logger.error(f"Failed to send SNS notification for status update: {sns_e}")
+            notification_outbox.enqueue("Medtrack Appointment Update", message,
+                                        recipient=appointment['patient_email'],
+                                        urgent=appointment['date'] <= datetime.now().strftime('%Y-%m-%d'))
+            logger.info(f"SNS notification queued for appointment status update: {appointment_id}.")
+            publish_change('appointment', {
+                'action': 'status',
+                'appointment_id': appointment_id,
+                'status': new_status,
+                'message': f"Your appointment with Dr. {appointment['doctor_name']} on {appointment['date']} "
+                           f"at {appointment['time']} is now {new_status}.",
+            }, appointment['patient_email'], appointment.get('doctor_email'))
         else:
             flash('Appointment not found or you do not have permission to update it.', 'error')
     except Exception as e:
@@ -420,15 +3730,14 @@ def add_medication_reminder():
             'taken_today': False,
             'last_checked_date': datetime.now().strftime('%Y-%m-%d')
         }
-        MEDICATION_REMINDERS_TABLE.put_item(Item=new_reminder)
-
+        storage.put(MEDICATION_REMINDERS_TABLE, new_reminder)
+        record_reminder_change(new_reminder['reminder_id'])
         message = (f"New medication reminder set: {medication} ({dosage}) "
                    f"at {', '.join(times)} starting {start_date_str} (Frequency: {frequency.capitalize()}).")
-        try:
-            sns_client.publish(TopicArn=SNS_TOPIC_ARN, Message=message, Subject="Medtrack Medication Reminder Set")
-            logger.info(f"SNS notification sent for new medication reminder: {new_reminder['reminder_id']}.")
-        except Exception as sns_e:
-            logger.error(f"Failed to send SNS notification for reminder creation: {sns_e}")
+        notification_outbox.enqueue("Medtrack Medication Reminder Set", message, recipient=patient_email)
+        logger.info(f"SNS notification queued for new medication reminder: {new_reminder['reminder_id']}.")
+
+        publish_change('reminder', {'action': 'added', 'reminder_id': new_reminder['reminder_id']}, patient_email)
 
         flash(f'Medication reminder for {medication} added successfully!', 'success')
         return redirect(url_for('patient_dashboard', section='patient-medication-reminders-section'))
@@ -447,63 +3756,38 @@ def mark_reminder_taken(reminder_id):
     action = request.form.get('action')
 
     try:
-        response = MEDICATION_REMINDERS_TABLE.get_item(Key={'reminder_id': reminder_id})
-        reminder = response.get('Item')
+        reminder = storage.get(MEDICATION_REMINDERS_TABLE, reminder_id)
 
         if reminder and reminder['patient_email'] == patient_email:
             today = datetime.now().strftime('%Y-%m-%d')
 
             if 'last_checked_date' not in reminder:
-                MEDICATION_REMINDERS_TABLE.update_item(
-                    Key={'reminder_id': reminder_id},
-                    UpdateExpression="SET last_checked_date = :today",
-                    ExpressionAttributeValues={':today': today}
-                )
+                storage.update(MEDICATION_REMINDERS_TABLE, reminder_id, {'last_checked_date': today})
                 reminder['last_checked_date'] = today
 
             if reminder.get('frequency') and 'daily' in reminder['frequency'] and reminder['last_checked_date'] != today:
-                MEDICATION_REMINDERS_TABLE.update_item(
-                    Key={'reminder_id': reminder_id},
-                    UpdateExpression="SET taken_today = :false, #s = :pending, last_checked_date = :today",
-                    ExpressionAttributeNames={'#s': 'status'},
-                    ExpressionAttributeValues={
-                        ':false': False,
-                        ':pending': 'Pending',
-                        ':today': today
-                    }
-                )
+                storage.update(MEDICATION_REMINDERS_TABLE, reminder_id, {
+                    'taken_today': False,
+                    'status': 'Pending',
+                    'last_checked_date': today
+                })
                 reminder['taken_today'] = False
                 reminder['status'] = 'Pending'
                 reminder['last_checked_date'] = today
 
             if action == 'take':
                 if not reminder['taken_today']:
-                    MEDICATION_REMINDERS_TABLE.update_item(
-                        Key={'reminder_id': reminder_id},
-                        UpdateExpression="SET taken_today = :true, #s = :taken",
-                        ExpressionAttributeNames={'#s': 'status'},
-                        ExpressionAttributeValues={
-                            ':true': True,
-                            ':taken': 'Taken'
-                        }
-                    )
+                    storage.update(MEDICATION_REMINDERS_TABLE, reminder_id, {'taken_today': True, 'status': 'Taken'})
                     flash(f"Medication '{reminder['medication']}' marked as taken for today.", 'success')
                 else:
                     flash(f"Medication '{reminder['medication']}' already marked as taken today.", 'info')
             elif action == 'unmark':
                 if reminder['taken_today']:
-                    MEDICATION_REMINDERS_TABLE.update_item(
-                        Key={'reminder_id': reminder_id},
-                        UpdateExpression="SET taken_today = :false, #s = :pending",
-                        ExpressionAttributeNames={'#s': 'status'},
-                        ExpressionAttributeValues={
-                            ':false': False,
-                            ':pending': 'Pending'
-                        }
-                    )
+                    storage.update(MEDICATION_REMINDERS_TABLE, reminder_id, {'taken_today': False, 'status': 'Pending'})
                     flash(f"Medication '{reminder['medication']}' unmarked for today.", 'info')
                 else:
                     flash(f"Medication '{reminder['medication']}' is already pending.", 'info')
+            publish_change('reminder', {'action': 'updated', 'reminder_id': reminder_id}, patient_email)
         else:
             flash('Reminder not found or you do not have permission to update it.', 'error')
     except Exception as e:
@@ -526,8 +3810,7 @@ def issue_prescription():
     instructions = request.form['instructions']
 
     try:
-        response = USERS_TABLE.get_item(Key={'email': patient_email})
-        patient_user = response.get('Item')
+        patient_user = storage.get(USERS_TABLE, patient_email)
 
         if not patient_user or patient_user.get('user_type') != 'patient':
             flash('Patient with this email does not exist or is not a patient user type.', 'error')
@@ -535,6 +3818,7 @@ def issue_prescription():
 
         new_prescription = {
             'prescription_id': str(uuid.uuid4()),
+            'doctor_email': session['user_email'],
             'doctor_name': doctor_name,
             'patient_email': patient_email,
             'patient_name': patient_user['name'],
@@ -543,15 +3827,17 @@ def issue_prescription():
             'instructions': instructions,
             'date_prescribed': datetime.now().strftime('%Y-%m-%d')
         }
-        PRESCRIPTIONS_TABLE.put_item(Item=new_prescription)
-
+        storage.put(PRESCRIPTIONS_TABLE, new_prescription)
         message = (f"New prescription issued: Dr. {doctor_name} prescribed {medication} ({dosage}) "
                    f"for {patient_user['name']} ({patient_email}). Instructions: {instructions}")
-        try:
-            sns_client.publish(TopicArn=SNS_TOPIC_ARN, Message=message, Subject="Medtrack New Prescription")
-            logger.info(f"SNS notification sent for new prescription: {new_prescription['prescription_id']}.")
-        except Exception as sns_e:
-            logger.error(f"Failed to send SNS notification for prescription: {sns_e}")
+        notification_outbox.enqueue("Medtrack New Prescription", message, recipient=patient_email)
+        logger.info(f"SNS notification queued for new prescription: {new_prescription['prescription_id']}.")
+
+        publish_change('prescription', {
+            'action': 'issued',
+            'prescription_id': new_prescription['prescription_id'],
+            'message': f"New prescription from Dr. {doctor_name}: {medication} ({dosage}).",
+        }, patient_email, session['user_email'])
 
         flash(f'Prescription for {patient_user["name"]} issued successfully!', 'success')
         return redirect(url_for('doctor_dashboard', section='doctor-prescriptions-section'))
@@ -569,11 +3855,12 @@ def delete_reminder(reminder_id):
 
     patient_email = session['user_email']
     try:
-        response = MEDICATION_REMINDERS_TABLE.get_item(Key={'reminder_id': reminder_id})
-        reminder = response.get('Item')
+        reminder = storage.get(MEDICATION_REMINDERS_TABLE, reminder_id)
 
         if reminder and reminder['patient_email'] == patient_email:
-            MEDICATION_REMINDERS_TABLE.delete_item(Key={'reminder_id': reminder_id})
+            storage.delete(MEDICATION_REMINDERS_TABLE, reminder_id)
+            record_reminder_change(reminder_id)
+            publish_change('reminder', {'action': 'deleted', 'reminder_id': reminder_id}, patient_email)
             flash('Medication reminder deleted successfully.', 'success')
         else:
             flash('Medication reminder not found or you do not have permission to delete it.', 'error')
@@ -582,5 +3869,80 @@ def delete_reminder(reminder_id):
         flash('An error occurred while deleting the reminder. Please try again.', 'error')
     return redirect(url_for('patient_dashboard', section='patient-medication-reminders-section'))
 
+
+@app.route('/events')
+def events():
+    if not LIVE_UPDATES_ENABLED:
+        abort(404)
+    if 'user_email' not in session:
+        return '', 401
+    subscription = event_bus.subscribe(session['user_email'], limit=sse_connection_limit())
+    if subscription is None:
+        # The browser's EventSource retries on its own; the dashboards keep working without it.
+        return '', 503
+
+    def stream():
+        try:
+            # Tells the browser to reconnect after 5 seconds if the stream drops.
+            yield "retry: 5000\n\n"
+            while True:
+                changes, overflowed = subscription.get(SSE_KEEPALIVE_SECONDS)
+                if overflowed:
+                    yield format_sse('resync', {})
+                for event_type, data in changes:
+                    yield format_sse(event_type, data)
+                if not changes and not overflowed:
+                    yield ": keepalive\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    response = app.response_class(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keeps nginx from buffering the stream.
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route(f'{API_PREFIX}/appointments')
+def api_appointments():
+    if 'user_email' not in session:
+        return api_error('Login required.', 401)
+    field = 'patient_email' if session['user_type'] == 'patient' else 'doctor_email'
+    return user_data_response('appointments', partial(load_api_page, APPOINTMENTS_TABLE, field, 'date'))
+
+
+@app.route(f'{API_PREFIX}/reminders')
+def api_reminders():
+    if 'user_email' not in session:
+        return api_error('Login required.', 401)
+    if session['user_type'] != 'patient':
+        return api_error('Only patients have medication reminders.', 403)
+    # Rollover depends on the date, so the same data version yields a new ETag each day.
+    today = datetime.now().strftime('%Y-%m-%d')
+    return user_data_response('reminders', partial(load_api_reminders, today=today), today)
+
+
+@app.route(f'{API_PREFIX}/prescriptions')
+def api_prescriptions():
+    if 'user_email' not in session:
+        return api_error('Login required.', 401)
+    field = 'patient_email' if session['user_type'] == 'patient' else 'doctor_email'
+    return user_data_response('prescriptions', partial(load_api_page, PRESCRIPTIONS_TABLE, field, 'date_prescribed'))
+
+
+@app.route(f'{API_PREFIX}/doctors')
+def api_doctors():
+    if 'user_email' not in session:
+        return api_error('Login required.', 401)
+    try:
+        # The directory is cached in memory, so hashing it is the cheap path here.
+        doctors = [{field: doctor.get(field) for field in DOCTOR_PUBLIC_FIELDS} for doctor in doctor_directory.get()]
+    except Exception as e:
+        logger.error(f"Error serving doctors API: {e}")
+        return api_error('Data is temporarily unavailable. Please try again later.', 503)
+    etag = make_etag(API_PREFIX, 'doctors', json.dumps(doctors, sort_keys=True, default=str))
+    return conditional_json(etag, lambda: {'doctors': doctors})
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,139 @@
+# Shared setup for the benchmark scripts. Run them from the repository root, e.g.
+# `python bench/dashboard_latency.py`; each prints a small table and exits.
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Benchmarks run against the in-memory backend: no AWS account or network is needed.
+_workdir = tempfile.mkdtemp(prefix='medtrack-bench-')
+os.environ.setdefault('MEDTRACK_STORAGE', 'memory')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('SECRET_KEY', 'bench-secret')
+os.environ.setdefault('NOTIFICATION_OUTBOX_PATH', os.path.join(_workdir, 'outbox.db'))
+os.environ.setdefault('REMINDER_CHANGE_LOG_PATH', os.path.join(_workdir, 'reminder_changes.db'))
+os.environ.setdefault('SESSION_SQLITE_PATH', os.path.join(_workdir, 'sessions.db'))
+os.environ.setdefault('REQUEST_DEADLINE_SECONDS', '0')
+# Keeps the app's per-request INFO logging out of the results.
+logging.disable(logging.INFO)
+
+import app as medtrack  # noqa: E402
+
+
+class LatencyStorage(medtrack.MemoryStorage):
+    # The in-memory backend with a fixed delay on every call, standing in for DynamoDB round trips.
+    def __init__(self, latency_seconds):
+        super().__init__()
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    def _wait(self):
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def get(self, table_name, key):
+        self._wait()
+        return super().get(table_name, key)
+
+    def get_many(self, table_name, keys):
+        self._wait()
+        return super().get_many(table_name, keys)
+
+    def put(self, table_name, item):
+        self._wait()
+        return super().put(table_name, item)
+
+    def update(self, table_name, key, changes):
+        self._wait()
+        return super().update(table_name, key, changes)
+
+    def delete(self, table_name, key):
+        self._wait()
+        return super().delete(table_name, key)
+
+    def query(self, table_name, field, value, max_items=None):
+        self._wait()
+        return super().query(table_name, field, value, max_items=max_items)
+
+    def query_page(self, table_name, field, value, sort_key, limit, cursor=None, descending=False):
+        self._wait()
+        return super().query_page(table_name, field, value, sort_key, limit, cursor=cursor, descending=descending)
+
+
+def use_storage(storage):
+    medtrack.storage = storage
+    medtrack.doctor_directory.invalidate()
+    return storage
+
+
+def seed_patient(storage, appointments=10, prescriptions=10, reminders=3,
+                 patient_email='pat@example.com', doctor_email='doc@example.com'):
+    # Writes straight to the store, bypassing any injected latency.
+    put = medtrack.MemoryStorage.put.__get__(storage)
+    password = medtrack.password_hasher.hash('secret')
+    put(medtrack.USERS_TABLE, {'email': doctor_email, 'name': 'Doc', 'user_type': 'doctor',
+                               'password': password, 'specialization': 'General', 'location': 'Hyderabad'})
+    put(medtrack.USERS_TABLE, {'email': patient_email, 'name': 'Pat', 'user_type': 'patient', 'password': password})
+    for number in range(appointments):
+        put(medtrack.APPOINTMENTS_TABLE, {
+            'appointment_id': f'apt-{number:05d}', 'patient_email': patient_email, 'patient_name': 'Pat',
+            'doctor_email': doctor_email, 'doctor_name': 'Doc', 'date': f'2030-{number % 12 + 1:02d}-{number % 28 + 1:02d}',
+            'time': '10:00', 'reason': f'Follow-up visit number {number}', 'status': 'Pending',
+        })
+    for number in range(prescriptions):
+        put(medtrack.PRESCRIPTIONS_TABLE, {
+            'prescription_id': f'pres-{number:05d}', 'patient_email': patient_email, 'patient_name': 'Pat',
+            'doctor_email': doctor_email, 'doctor_name': 'Doc', 'medication': f'Medication {number}',
+            'dosage': '1 tablet', 'instructions': 'After food', 'date_prescribed': f'2030-01-{number % 28 + 1:02d}',
+        })
+    for number in range(reminders):
+        put(medtrack.MEDICATION_REMINDERS_TABLE, {
+            'reminder_id': f'rem-{number:05d}', 'patient_email': patient_email, 'medication': f'Medication {number}',
+            'dosage': '1 tablet', 'frequency': 'once_daily', 'times': ['08:00'], 'date': '2030-01-01',
+            'end_date': None, 'is_active': True, 'status': 'Pending', 'taken_today': False,
+            'last_checked_date': '2030-01-01',
+        })
+
+
+def logged_in_client(email='pat@example.com', password='secret'):
+    client = medtrack.app.test_client()
+    response = client.post('/login', data={'email': email, 'password': password})
+    if response.status_code != 302:
+        raise RuntimeError(f"Login as {email} failed with status {response.status_code}")
+    client.get('/')  # Consumes the welcome flash.
+    return client
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(samples):
+    # Milliseconds: mean, p50 and p99 of a list of durations in seconds.
+    return {
+        'mean_ms': round(statistics.mean(samples) * 1000, 2),
+        'p50_ms': round(percentile(samples, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 2),
+    }
+
+
+def print_table(rows):
+    columns = list(rows[0])
+    widths = [max(len(str(column)), *(len(str(row[column])) for row in rows)) for column in columns]
+    print('  '.join(str(column).ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def shutdown():
+    # Stops the outbox workers without waiting for notifications no SNS topic will accept.
+    import atexit
+    atexit.unregister(medtrack.notification_outbox.shutdown)
+    medtrack.notification_outbox.shutdown(timeout=0.1)
@@ -0,0 +1,56 @@
+# Bytes on the wire and time to last byte for a 500-row appointments list, sent uncompressed,
+# gzip-compressed and (when the brotli module is installed) brotli-compressed by the compression
+# middleware. Server time is measured in-process; the link columns add the transfer time of the
+# measured bytes at typical mobile and broadband speeds.
+import argparse
+import os
+import time
+
+os.environ.setdefault('DASHBOARD_PAGE_SIZE', '500')
+
+from _common import (LatencyStorage, logged_in_client, medtrack, print_table, seed_patient, shutdown,  # noqa: E402
+                     summarize, use_storage)
+
+LINKS_MBPS = {'3g_1.6mbps': 1.6, '4g_10mbps': 10}
+
+
+def fetch(client, path, encoding):
+    headers = {'Accept-Encoding': encoding} if encoding != 'identity' else {}
+    started = time.perf_counter()
+    response = client.get(path, headers=headers, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    elapsed = time.perf_counter() - started
+    response.close()
+    if response.headers.get('Content-Encoding', 'identity') != encoding:
+        raise RuntimeError(f"Expected a {encoding} response, got {response.headers.get('Content-Encoding')}")
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    storage = use_storage(LatencyStorage(0))
+    seed_patient(storage, appointments=args.rows, prescriptions=0, reminders=0)
+    client = logged_in_client()
+    path = '/patient_dashboard/appointments'
+
+    encodings = ['identity', 'gzip'] + (['br'] if medtrack.brotli is not None else [])
+    rows = []
+    for encoding in encodings:
+        results = [fetch(client, path, encoding) for _ in range(args.runs)]
+        size = results[-1][0]
+        server = summarize([elapsed for _, elapsed in results])
+        row = {'encoding': encoding, 'bytes': size, 'server_p50_ms': server['p50_ms']}
+        for link, mbps in LINKS_MBPS.items():
+            row[f'ttlb_{link}_ms'] = round(server['p50_ms'] + size * 8 / (mbps * 1000), 1)
+        rows.append(row)
+    print(f"{args.rows} appointment rows, {args.runs} runs each")
+    print_table(rows)
+    shutdown()
+
+
+if __name__ == '__main__':
+    main()
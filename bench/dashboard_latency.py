@@ -0,0 +1,68 @@
+# Time until every section of the patient dashboard has loaded, with a fixed delay injected into
+# each storage call. "serial" issues the section reads one after another, as the dashboard did
+# before its reads were split up; "parallel" fetches the section fragments concurrently, as the
+# dashboard page does in the browser, so the total approaches the slowest single section.
+import argparse
+import threading
+import time
+
+from _common import (LatencyStorage, logged_in_client, medtrack, print_table, seed_patient, shutdown,
+                     summarize, use_storage)
+
+SECTIONS = ['appointments', 'prescriptions', 'reminders', 'doctor_options', 'doctors']
+
+
+def load_serial(client):
+    for section in SECTIONS:
+        client.get(f'/patient_dashboard/{section}').get_data()
+
+
+def load_parallel(client):
+    cookie = client.get_cookie('session').value
+    errors = []
+
+    def fetch(section):
+        # The test client is not thread-safe, so each "browser connection" gets its own.
+        connection = medtrack.app.test_client()
+        connection.set_cookie('session', cookie)
+        response = connection.get(f'/patient_dashboard/{section}')
+        response.get_data()
+        if response.status_code != 200:
+            errors.append((section, response.status_code))
+
+    threads = [threading.Thread(target=fetch, args=(section,)) for section in SECTIONS]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise RuntimeError(f"Fragment requests failed: {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency-ms', type=float, nargs='+', default=[0, 5, 20, 50])
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = []
+    for latency_ms in args.latency_ms:
+        storage = use_storage(LatencyStorage(0))
+        seed_patient(storage, appointments=30, prescriptions=30, reminders=5)
+        client = logged_in_client()
+        storage.latency_seconds = latency_ms / 1000
+        for mode, load in (('serial', load_serial), ('parallel', load_parallel)):
+            samples = []
+            for _ in range(args.runs):
+                # The doctor directory is cached; clearing it makes every run pay for that read too.
+                medtrack.doctor_directory.invalidate()
+                started = time.perf_counter()
+                load(client)
+                samples.append(time.perf_counter() - started)
+            rows.append({'latency_ms': latency_ms, 'mode': mode, **summarize(samples)})
+    print_table(rows)
+    shutdown()
+
+
+if __name__ == '__main__':
+    main()
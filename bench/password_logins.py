@@ -0,0 +1,77 @@
+# Login throughput and latency under concurrent logins. `--clients` threads each log in over and
+# over for `--seconds`; every configuration of PASSWORD_HASH_WORKERS (--workers) and
+# PASSWORD_HASH_MAX_PENDING (--max-pending) gets a fresh password hasher with the iteration count
+# the app would use on this host. Logins turned away with a 503 are counted as busy and retried
+# after --retry-ms; the latency columns cover successful logins only.
+import argparse
+import logging
+import threading
+import time
+
+from _common import medtrack, print_table, seed_patient, shutdown, summarize, use_storage
+
+
+def run_clients(clients, seconds, retry_seconds):
+    latencies, busy, failed = [], [0], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def login_loop():
+        # The test client is not thread-safe, so each simulated user gets its own.
+        client = medtrack.app.test_client()
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            response = client.post('/login', data={'email': 'pat@example.com', 'password': 'secret'})
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 302:
+                    latencies.append(elapsed)
+                elif response.status_code == 503:
+                    busy[0] += 1
+                else:
+                    failed[0] += 1
+            if response.status_code == 503:
+                time.sleep(retry_seconds)
+            else:
+                client.get('/logout')
+
+    threads = [threading.Thread(target=login_loop) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, busy[0], failed[0], time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, medtrack.PASSWORD_HASH_WORKERS])
+    parser.add_argument('--max-pending', type=int, nargs='+', default=[8, medtrack.PASSWORD_HASH_MAX_PENDING])
+    parser.add_argument('--iterations', type=int, default=medtrack.password_hash_iterations)
+    parser.add_argument('--retry-ms', type=float, default=50)
+    args = parser.parse_args()
+    # Keeps the "Login turned away" warnings of busy logins out of the results.
+    logging.disable(logging.WARNING)
+
+    storage = use_storage(medtrack.MemoryStorage())
+    rows = []
+    for workers in sorted(set(args.workers)):
+        for max_pending in sorted(set(args.max_pending)):
+            medtrack.password_hasher = medtrack.PasswordHasher(args.iterations, workers, max_pending)
+            # Re-seeded so the stored hash matches the hasher and no login triggers a rehash.
+            seed_patient(storage, appointments=0, prescriptions=0, reminders=0)
+            latencies, busy, failed, elapsed = run_clients(args.clients, args.seconds, args.retry_ms / 1000)
+            row = {'workers': workers, 'max_pending': max_pending, 'logins': len(latencies), 'busy': busy,
+                   'failed': failed, 'logins_per_s': round(len(latencies) / elapsed, 1)}
+            row.update(summarize(latencies) if latencies else {'mean_ms': '-', 'p50_ms': '-', 'p99_ms': '-'})
+            rows.append(row)
+    print(f"{args.clients} concurrent clients for {args.seconds} s each, {args.iterations} PBKDF2 iterations")
+    print_table(rows)
+    shutdown()
+
+
+if __name__ == '__main__':
+    main()
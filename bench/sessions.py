@@ -0,0 +1,88 @@
+# Per-request cost of the server-side session backends compared with Flask's signed cookie
+# sessions, for a request that only reads the session and one that writes it, next to the size of
+# the session cookie each backend makes the browser send. The app's routes do their own storage
+# work, so the timed requests go to two small routes registered here that touch nothing but the
+# session. The overhead columns subtract the same request served with sessions switched off.
+import argparse
+import secrets
+import time
+
+from flask import session
+from flask.sessions import SecureCookieSessionInterface
+
+from _common import logged_in_client, medtrack, print_table, seed_patient, shutdown, summarize, use_storage
+
+
+@medtrack.app.route('/_bench/read')
+def bench_read():
+    return session.get('username', '')
+
+
+@medtrack.app.route('/_bench/write')
+def bench_write():
+    session['bench_counter'] = session.get('bench_counter', 0) + 1
+    return ''
+
+
+class NoSessionInterface(SecureCookieSessionInterface):
+    # Every request gets Flask's read-only null session: nothing is loaded or saved.
+    def open_session(self, app, request):
+        return None
+
+
+def backends():
+    yield 'cookie', SecureCookieSessionInterface()
+    yield 'memory', medtrack.create_session_interface('memory')
+    yield 'sqlite', medtrack.create_session_interface('sqlite')
+
+
+def timed(client, path, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} answered {response.status_code}")
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=2000)
+    parser.add_argument('--payload', type=int, default=0,
+                        help='extra characters kept in the session, e.g. a long list of flashed messages')
+    args = parser.parse_args()
+
+    seed_patient(use_storage(medtrack.MemoryStorage()), appointments=0, prescriptions=0, reminders=0)
+    cookie_name = medtrack.app.config['SESSION_COOKIE_NAME']
+    medtrack.app.session_interface = NoSessionInterface()
+    baseline = summarize(timed(medtrack.app.test_client(), '/_bench/read', args.runs))['p50_ms']
+    rows = []
+    for name, interface in backends():
+        medtrack.app.session_interface = interface
+        client = logged_in_client()
+        if args.payload:
+            with client.session_transaction() as stored:
+                # Random text: the signed cookie is compressed, repeated characters would hide its size.
+                stored['bench_payload'] = secrets.token_urlsafe(args.payload)[:args.payload]
+        read = summarize(timed(client, '/_bench/read', args.runs))
+        write = summarize(timed(client, '/_bench/write', args.runs))
+        rows.append({
+            'backend': name,
+            'cookie_bytes': len(client.get_cookie(cookie_name).value),
+            'read_p50_ms': read['p50_ms'],
+            'read_overhead_ms': round(read['p50_ms'] - baseline, 2),
+            'read_p99_ms': read['p99_ms'],
+            'write_p50_ms': write['p50_ms'],
+            'write_overhead_ms': round(write['p50_ms'] - baseline, 2),
+            'write_p99_ms': write['p99_ms'],
+        })
+    print(f"{args.runs} requests per route, {args.payload} extra characters in the session, "
+          f"{baseline} ms p50 without sessions")
+    print_table(rows)
+    shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import atexit
+import os
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import time: run it on in-memory storage, keep the local logs
+# out of the working directory and use a cheap password hash so logins do not dominate the run.
+_workdir = tempfile.mkdtemp(prefix='medtrack-tests-')
+os.environ.setdefault('MEDTRACK_STORAGE', 'memory')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ.setdefault('NOTIFICATION_OUTBOX_PATH', os.path.join(_workdir, 'outbox.db'))
+os.environ.setdefault('REMINDER_CHANGE_LOG_PATH', os.path.join(_workdir, 'reminder_changes.db'))
+os.environ.setdefault('PASSWORD_HASH_ITERATIONS', '1000')
+os.environ.setdefault('TEMPLATE_WARMUP', 'false')
+
+import app as medtrack  # noqa: E402
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    # A fresh, empty store per test; the doctor directory cache must not outlive it.
+    storage = medtrack.MemoryStorage()
+    monkeypatch.setattr(medtrack, 'storage', storage)
+    medtrack.doctor_directory.invalidate()
+    yield storage
+    medtrack.doctor_directory.invalidate()
+
+
+@pytest.fixture
+def client(storage):
+    return medtrack.app.test_client()
+
+
+def register(client, email, user_type, name=None, password='secret'):
+    return client.post('/register', data={
+        'name': name or email.split('@')[0].title(),
+        'email': email,
+        'password': password,
+        'confirm_password': password,
+        'user_type': user_type,
+        'specialization': 'General',
+        'location': 'Hyderabad',
+    })
+
+
+def login(client, email, password='secret'):
+    return client.post('/login', data={'email': email, 'password': password})
+
+
+@pytest.fixture(scope='session', autouse=True)
+def stop_background_workers():
+    # Stops the outbox while pytest's log capture is still open, rather than from atexit.
+    yield
+    atexit.unregister(medtrack.notification_outbox.shutdown)
+    medtrack.notification_outbox.shutdown(timeout=1)
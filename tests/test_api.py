@@ -0,0 +1,60 @@
+import app as medtrack
+from conftest import login, register
+
+
+def add_appointments(storage, count):
+    for number in range(count):
+        storage.put(medtrack.APPOINTMENTS_TABLE, {
+            'appointment_id': f'apt-{number:03d}', 'patient_email': 'pat@example.com',
+            'doctor_email': 'doc@example.com', 'date': f'2030-01-{number % 28 + 1:02d}', 'status': 'Pending',
+        })
+
+
+def test_api_lists_are_paginated_without_losing_items(client, storage):
+    register(client, 'pat@example.com', 'patient')
+    login(client, 'pat@example.com')
+    add_appointments(storage, 7)
+
+    seen = []
+    url = f'{medtrack.API_PREFIX}/appointments?limit=3'
+    pages = 0
+    while url:
+        body = client.get(url).get_json()
+        seen += [apt['appointment_id'] for apt in body['appointments']]
+        pages += 1
+        url = body['next_cursor'] and f"{medtrack.API_PREFIX}/appointments?limit=3&cursor={body['next_cursor']}"
+
+    assert pages == 3
+    assert sorted(seen) == [f'apt-{number:03d}' for number in range(7)]
+
+
+def test_api_rejects_bad_limits_and_cursors(client, storage):
+    register(client, 'pat@example.com', 'patient')
+    login(client, 'pat@example.com')
+
+    assert client.get(f'{medtrack.API_PREFIX}/appointments?limit=0').status_code == 400
+    assert client.get(f'{medtrack.API_PREFIX}/prescriptions?cursor=garbage').status_code == 400
+
+
+def test_booking_queues_its_notification_before_bumping_data_versions(client, storage, monkeypatch):
+    register(client, 'doc@example.com', 'doctor', name='Doc')
+    register(client, 'pat@example.com', 'patient')
+    login(client, 'pat@example.com')
+    calls = []
+    monkeypatch.setattr(medtrack.notification_outbox, 'enqueue', lambda *args, **kwargs: calls.append('enqueue'))
+    update = storage.update
+
+    def failing_user_update(table_name, key, changes):
+        if table_name == medtrack.USERS_TABLE:
+            calls.append('touch')
+            raise ConnectionError('throttled')
+        return update(table_name, key, changes)
+
+    monkeypatch.setattr(storage, 'update', failing_user_update)
+    response = client.post('/book_appointment', data={
+        'doctor_email': 'doc@example.com', 'appointment_date': '2030-01-01', 'appointment_time': '10:00',
+        'reason': 'Checkup',
+    }, follow_redirects=True)
+
+    assert b'Appointment booked successfully' in response.data
+    assert calls[0] == 'enqueue' and 'touch' in calls
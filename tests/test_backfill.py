@@ -0,0 +1,27 @@
+import app as medtrack
+
+
+def add_doctor(storage, email, name):
+    storage.put(medtrack.USERS_TABLE, {'email': email, 'name': name, 'user_type': 'doctor', 'password': 'x'})
+
+
+def test_backfill_skips_doctor_names_shared_by_several_doctors(storage):
+    add_doctor(storage, 'lee1@example.com', 'Lee')
+    add_doctor(storage, 'lee2@example.com', 'Lee')
+    add_doctor(storage, 'rao@example.com', 'Rao')
+    storage.put(medtrack.APPOINTMENTS_TABLE, {
+        'appointment_id': 'a1', 'doctor_name': 'Lee', 'patient_email': 'pat@example.com',
+    })
+    storage.put(medtrack.APPOINTMENTS_TABLE, {
+        'appointment_id': 'a2', 'doctor_name': 'Rao', 'patient_email': 'pat@example.com',
+    })
+    storage.put(medtrack.PRESCRIPTIONS_TABLE, {
+        'prescription_id': 'p1', 'doctor_name': 'Lee', 'patient_email': 'pat@example.com',
+    })
+
+    result = medtrack.backfill_doctor_emails()
+
+    assert result == {'updated': 1, 'skipped': 2, 'ambiguous': {'Lee': ['lee1@example.com', 'lee2@example.com']}}
+    assert storage.get(medtrack.APPOINTMENTS_TABLE, 'a2')['doctor_email'] == 'rao@example.com'
+    assert 'doctor_email' not in storage.get(medtrack.APPOINTMENTS_TABLE, 'a1')
+    assert 'doctor_email' not in storage.get(medtrack.PRESCRIPTIONS_TABLE, 'p1')
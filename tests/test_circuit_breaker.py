@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+import app as medtrack
+
+
+class Unavailable(Exception):
+    pass
+
+
+@pytest.fixture
+def downstream_errors(monkeypatch):
+    monkeypatch.setattr(medtrack, 'is_downstream_failure', lambda error: isinstance(error, Unavailable))
+
+
+def fail():
+    raise Unavailable()
+
+
+def test_call_is_refused_when_the_budget_cannot_cover_it():
+    breaker = medtrack.CircuitBreaker('table', failure_threshold=1, reset_timeout=30, call_timeout=1.0)
+    calls = []
+    token = medtrack.request_deadline.set(time.monotonic() + 0.5)
+    try:
+        with pytest.raises(medtrack.DeadlineExceeded):
+            breaker.call(calls.append, 'called')
+    finally:
+        medtrack.request_deadline.reset(token)
+    assert calls == []
+    assert breaker.stats()['deadline_exceeded'] == 1
+
+
+def test_only_the_probe_closes_a_half_open_circuit(downstream_errors):
+    breaker = medtrack.CircuitBreaker('table', failure_threshold=1, reset_timeout=0.05)
+    release_slow, release_probe = threading.Event(), threading.Event()
+
+    def run(operation):
+        try:
+            breaker.call(operation)
+        except Unavailable:
+            pass
+
+    # A slow call starts while the circuit is closed and outlives its opening.
+    slow = threading.Thread(target=run, args=(lambda: release_slow.wait(5),))
+    slow.start()
+    with pytest.raises(Unavailable):
+        breaker.call(fail)
+    assert breaker.stats()['state'] == 'open'
+
+    time.sleep(0.06)
+
+    def probe_fails():
+        release_probe.wait(5)
+        raise Unavailable()
+
+    probe = threading.Thread(target=run, args=(probe_fails,))
+    probe.start()
+    deadline = time.monotonic() + 5
+    while not breaker._probe_in_flight and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    release_slow.set()
+    slow.join()
+    assert breaker.stats()['state'] == 'half_open'
+
+    release_probe.set()
+    probe.join()
+    assert breaker.stats()['state'] == 'open'
+
+
+def test_aws_retries_stop_when_another_attempt_would_outlast_the_deadline():
+    attempt = medtrack.aws_clients.config.connect_timeout + medtrack.aws_clients.config.read_timeout
+    medtrack.aws_clients._check_deadline()  # No deadline outside a request.
+    token = medtrack.request_deadline.set(time.monotonic() + attempt / 2)
+    try:
+        with pytest.raises(medtrack.DeadlineExceeded):
+            medtrack.aws_clients._check_deadline()
+    finally:
+        medtrack.request_deadline.reset(token)
@@ -0,0 +1,41 @@
+from flask import Flask, request
+
+import app as medtrack
+
+BODY = 'medication reminder ' * 100
+
+
+def make_client():
+    inner = Flask(__name__)
+
+    @inner.route('/page')
+    def page():
+        response = inner.response_class(BODY, mimetype='text/html')
+        response.set_etag('v1')
+        return response.make_conditional(request)
+
+    inner.wsgi_app = medtrack.CompressionMiddleware(inner.wsgi_app, min_size=500, gzip_level=6, brotli_quality=5)
+    return inner.test_client()
+
+
+def test_revalidated_compressed_response_keeps_its_etag():
+    client = make_client()
+    first = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert first.headers['ETag'] == '"v1-gzip"'
+
+    second = client.get('/page', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == '"v1-gzip"'
+    assert 'Accept-Encoding' in second.headers['Vary']
+    assert 'Content-Encoding' not in second.headers
+
+
+def test_revalidated_identity_response_keeps_its_etag():
+    client = make_client()
+    first = client.get('/page')
+    assert first.headers['ETag'] == '"v1"'
+
+    second = client.get('/page', headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"v1"'})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == '"v1"'
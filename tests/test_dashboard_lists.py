@@ -0,0 +1,26 @@
+import re
+
+import app as medtrack
+from conftest import login, register
+
+
+def test_reminders_are_paged_without_dropping_any(client, storage, monkeypatch):
+    monkeypatch.setattr(medtrack, 'DASHBOARD_PAGE_SIZE', 4)
+    register(client, 'pat@example.com', 'patient')
+    login(client, 'pat@example.com')
+    for number in range(10):
+        storage.put(medtrack.MEDICATION_REMINDERS_TABLE, {
+            'reminder_id': f'rem-{number:02d}', 'patient_email': 'pat@example.com', 'medication': f'Med {number:02d}',
+            'dosage': '1 tablet', 'frequency': 'once_daily', 'times': ['08:00'], 'date': f'2030-01-{number + 1:02d}',
+            'is_active': True, 'status': 'Pending', 'taken_today': False,
+        })
+
+    seen = []
+    url = '/patient_dashboard/reminders'
+    while url:
+        body = client.get(url).get_data(as_text=True)
+        seen += re.findall(r'Med (\d\d) - ', body)
+        next_link = re.search(r'href="([^"]*cursor=[^"]*)"[^>]*>\s*Next page', body)
+        url = next_link and next_link.group(1).replace('&amp;', '&')
+
+    assert seen == [f'{number:02d}' for number in range(10)]
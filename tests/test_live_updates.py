@@ -0,0 +1,25 @@
+import app as medtrack
+from conftest import login, register
+
+
+def test_live_updates_are_off_by_default(storage, client):
+    register(client, 'patient@example.com', 'patient')
+    login(client, 'patient@example.com')
+    assert client.get('/events').status_code == 404
+    assert b'EventSource' not in client.get('/patient_dashboard').data
+
+
+def test_threaded_server_caps_streams_below_worker_capacity(storage, client, monkeypatch):
+    monkeypatch.setattr(medtrack, 'LIVE_UPDATES_ENABLED', True)
+    monkeypatch.setattr(medtrack, 'SSE_THREADED_MAX_CONNECTIONS', 2)
+    monkeypatch.setattr(medtrack, 'event_bus', medtrack.EventBus(4, 5000))
+    register(client, 'patient@example.com', 'patient')
+    login(client, 'patient@example.com')
+    assert b'EventSource' in client.get('/patient_dashboard').data
+
+    streams = [client.get('/events', buffered=False) for _ in range(3)]
+    try:
+        assert [response.status_code for response in streams] == [200, 200, 503]
+    finally:
+        for response in streams:
+            response.close()
@@ -0,0 +1,93 @@
+import pytest
+
+import app as medtrack
+from conftest import login, register
+
+
+class NoScanStorage(medtrack.MemoryStorage):
+    # Routes turn storage errors into flashes and redirects, so scans are recorded as well as refused.
+    def __init__(self):
+        super().__init__()
+        self.scanned = []
+
+    def scan(self, table_name):
+        self.scanned.append(table_name)
+        raise AssertionError(f"scan of {table_name} during a request")
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = NoScanStorage()
+    monkeypatch.setattr(medtrack, 'storage', storage)
+    medtrack.doctor_directory.invalidate()
+    yield storage
+    medtrack.doctor_directory.invalidate()
+
+
+def only(storage, table_name):
+    (item,) = storage.query(table_name, 'patient_email', 'pat@example.com')
+    return item
+
+
+def test_no_route_scans_a_table(client, storage):
+    visited = set()
+
+    def visit(method, path, **kwargs):
+        response = client.open(path, method=method, **kwargs)
+        response.get_data()
+        assert response.status_code < 500, (path, response.status_code)
+        visited.add(medtrack.app.url_map.bind('localhost').match(path, method=method)[0])
+        return response
+
+    visit('GET', '/')
+    visit('GET', '/register')
+    register(client, 'doc@example.com', 'doctor', name='Doc')
+    visit('POST', '/register', data={
+        'name': 'Pat', 'email': 'pat@example.com', 'password': 'secret',
+        'confirm_password': 'secret', 'user_type': 'patient',
+    })
+    visit('GET', '/login')
+    visit('POST', '/login', data={'email': 'pat@example.com', 'password': 'secret'})
+
+    visit('GET', '/patient_dashboard')
+    visit('POST', '/book_appointment', data={
+        'doctor_email': 'doc@example.com', 'appointment_date': '2030-01-02',
+        'appointment_time': '10:00', 'reason': 'Checkup',
+    })
+    visit('POST', '/add_medication_reminder', data={
+        'medication': 'Aspirin', 'dosage': '1 tablet', 'frequency': 'once_daily',
+        'times[]': ['08:00'], 'start_date': '2030-01-01',
+    })
+    reminder = only(storage, medtrack.MEDICATION_REMINDERS_TABLE)
+    visit('POST', f"/mark_reminder_taken/{reminder['reminder_id']}", data={'action': 'take'})
+    for fragment in medtrack.PATIENT_FRAGMENTS:
+        visit('GET', f'/patient_dashboard/{fragment}')
+    for resource in ('appointments', 'reminders', 'prescriptions', 'doctors'):
+        visit('GET', f'{medtrack.API_PREFIX}/{resource}')
+    visit('GET', f"/delete_reminder/{reminder['reminder_id']}")
+    appointment = only(storage, medtrack.APPOINTMENTS_TABLE)
+    visit('GET', f"/cancel_appointment/{appointment['appointment_id']}")
+    visit('GET', '/logout')
+
+    login(client, 'doc@example.com')
+    visit('GET', '/doctor_dashboard')
+    visit('POST', '/update_appointment_status', data={
+        'appointment_id': appointment['appointment_id'], 'status': 'Approved',
+    })
+    visit('POST', '/issue_prescription', data={
+        'patient_email_prescribe': 'pat@example.com', 'medication': 'Amoxicillin',
+        'dosage': '500mg', 'instructions': 'Twice a day',
+    })
+    for fragment in medtrack.DOCTOR_FRAGMENTS:
+        visit('GET', f'/doctor_dashboard/{fragment}')
+    visit('GET', '/metrics')
+
+    # The live update stream never ends, so only its opening is read.
+    response = client.get('/events', buffered=False)
+    assert response.status_code in (200, 404)
+    response.close()
+    visited.add('events')
+
+    assert storage.scanned == []
+    routes = {rule.endpoint for rule in medtrack.app.url_map.iter_rules() if rule.endpoint != 'static'}
+    assert routes <= visited
@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+import time
+
+import app as medtrack
+
+
+def make_outbox(path, publish_batch):
+    return medtrack.NotificationOutbox(
+        str(path), publish_batch, max_backlog=100, workers=1, lease_seconds=0.2, retry_base_seconds=0.01,
+        retry_max_seconds=0.1, poll_seconds=0.05, retention_seconds=60, batch_size=10, linger_seconds=0,
+        digest_window_seconds=0, digest_max_events=10
+    )
+
+
+def test_outbox_worker_survives_storage_errors(tmp_path):
+    published = []
+
+    def publish_batch(events):
+        published.extend(event['subject'] for event in events)
+        return {}
+
+    outbox = make_outbox(tmp_path / 'outbox.db', publish_batch)
+    deliver = outbox._deliver
+    failures = []
+
+    def flaky_deliver(events):
+        if not failures:
+            failures.append(events)
+            raise sqlite3.OperationalError('database is locked')
+        return deliver(events)
+
+    outbox._deliver = flaky_deliver
+    try:
+        outbox.enqueue('Appointment booked', 'See you soon')
+        deadline = time.monotonic() + 5
+        while not published and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert published == ['Appointment booked']
+        assert outbox.stats()['worker_errors'] == 1
+        assert all(worker.is_alive() for worker in outbox._workers)
+    finally:
+        outbox.shutdown(timeout=1)
+
+
+def test_enqueue_many_stores_a_batch_and_ignores_known_event_ids(tmp_path):
+    outbox = make_outbox(tmp_path / 'outbox.db', lambda events: {})
+    events = [{'subject': f'Dose {number}', 'message': 'Take it', 'event_id': f'dose-{number}', 'urgent': True}
+              for number in range(3)]
+
+    assert outbox.enqueue_many(events) == ['dose-0', 'dose-1', 'dose-2']
+    outbox.enqueue_many(events[:1])
+
+    assert outbox.stats()['enqueued'] == 3
+    assert outbox.stats()['duplicates'] == 1
+    outbox.shutdown(timeout=1)
+
+
+def test_digest_events_do_not_join_a_window_that_is_being_published(tmp_path):
+    publishing = threading.Event()
+    release = threading.Event()
+
+    def publish_batch(events):
+        publishing.set()
+        release.wait(5)
+        return {}
+
+    outbox = medtrack.NotificationOutbox(
+        str(tmp_path / 'outbox.db'), publish_batch, max_backlog=100, workers=1, lease_seconds=30,
+        retry_base_seconds=0.01, retry_max_seconds=0.1, poll_seconds=0.05, retention_seconds=60, batch_size=10,
+        linger_seconds=0, digest_window_seconds=0.2, digest_max_events=10
+    )
+    try:
+        outbox.enqueue('Appointment booked', 'See you soon', recipient='patient@example.com')
+        assert publishing.wait(5)
+
+        event_id = outbox.enqueue('Appointment cancelled', 'Sorry', recipient='patient@example.com')
+        due = outbox._connection().execute(
+            'SELECT next_attempt_at FROM outbox WHERE event_id = ?', (event_id,)
+        ).fetchone()[0]
+
+        assert due < time.time() + 1
+    finally:
+        release.set()
+        outbox.shutdown(timeout=1)
@@ -0,0 +1,35 @@
+import time
+
+from werkzeug.security import generate_password_hash
+
+import app as medtrack
+
+
+def make_hasher():
+    return medtrack.PasswordHasher(2000, workers=1, max_pending=4)
+
+
+def test_calibration_scales_above_the_floor_on_a_fast_host(monkeypatch):
+    # A host doing the 20000-iteration probe in 10 ms does 1,000,000 iterations in the 0.5 s target.
+    monkeypatch.setattr(medtrack.hashlib, 'pbkdf2_hmac', lambda *args: time.sleep(0.01))
+    iterations = medtrack.calibrate_password_iterations(0.5, 600000)
+
+    assert 600000 < iterations <= 1000000
+    assert medtrack.calibrate_password_iterations(0.05, 600000) == 600000
+
+
+def test_scrypt_hashes_are_not_downgraded():
+    hasher = make_hasher()
+    stored = generate_password_hash('secret', method='scrypt')
+
+    assert hasher.verify(stored, 'secret') == (True, None)
+
+
+def test_weaker_pbkdf2_hashes_are_rehashed():
+    hasher = make_hasher()
+    for method in ('pbkdf2:sha256:1000', 'pbkdf2:sha1:2000'):
+        matches, new_hash = hasher.verify(generate_password_hash('secret', method=method), 'secret')
+        assert matches
+        assert new_hash.startswith('pbkdf2:sha256:2000$')
+
+    assert hasher.verify(generate_password_hash('secret', method='pbkdf2:sha256:2000'), 'secret') == (True, None)
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+import app as medtrack
+from conftest import login, register
+
+REMINDERS = medtrack.MEDICATION_REMINDERS_TABLE
+
+
+def reminder(reminder_id='r1'):
+    return {
+        'reminder_id': reminder_id, 'patient_email': 'pat@example.com', 'medication': 'Aspirin',
+        'dosage': '1 tablet', 'frequency': 'once_daily', 'times': ['08:00', '20:00'],
+        'date': '2020-01-01', 'is_active': True,
+    }
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def scheduler(storage, tmp_path):
+    fired = []
+    lookups = []
+
+    def load_reminders_by_id(reminder_ids):
+        lookups.append(list(reminder_ids))
+        return storage.get_many(REMINDERS, reminder_ids)
+
+    changes = medtrack.ReminderChangeLog(str(tmp_path / 'changes.db'), retention_seconds=3600)
+    scheduler = medtrack.ReminderScheduler(
+        lambda: (item for item in storage.scan(REMINDERS) if item.get('is_active')),
+        load_reminders_by_id,
+        lambda doses: fired.extend(scheduled.reminder_id for scheduled, _ in doses),
+        changes, poll_seconds=0.02, batch_size=50
+    )
+    scheduler.fired = fired
+    scheduler.lookups = lookups
+    scheduler.changes = changes
+    yield scheduler
+    scheduler.stop()
+
+
+def make_due_now(scheduler, count=1):
+    with scheduler._condition:
+        now = time.time()
+        for position in range(count):
+            _, version, reminder_id = scheduler._heap[position]
+            scheduler._heap[position] = (now, version, reminder_id)
+        scheduler._condition.notify_all()
+
+
+def test_created_and_deleted_reminders_reach_the_scheduler_through_the_change_log(storage, scheduler):
+    scheduler.start()
+
+    storage.put(REMINDERS, reminder())
+    scheduler.changes.record('r1')
+    wait_for(lambda: scheduler.stats()['active_reminders'] == 1)
+
+    storage.delete(REMINDERS, 'r1')
+    scheduler.changes.record('r1')
+    wait_for(lambda: scheduler.stats()['active_reminders'] == 0)
+
+
+def test_a_reminder_deleted_elsewhere_does_not_fire(storage, scheduler):
+    storage.put(REMINDERS, reminder())
+    scheduler.start()
+    wait_for(lambda: scheduler.stats()['active_reminders'] == 1)
+
+    # Deleted by a process whose change this scheduler never sees.
+    storage.delete(REMINDERS, 'r1')
+    make_due_now(scheduler)
+    wait_for(lambda: scheduler.stats()['skipped_inactive'] == 1)
+
+    assert scheduler.fired == []
+    assert scheduler.stats()['active_reminders'] == 0
+
+
+def test_an_active_reminder_fires(storage, scheduler):
+    storage.put(REMINDERS, reminder())
+    scheduler.start()
+    wait_for(lambda: scheduler.stats()['active_reminders'] == 1)
+
+    make_due_now(scheduler)
+    wait_for(lambda: scheduler.fired == ['r1'])
+
+
+def test_doses_due_together_are_rechecked_in_batches(storage, scheduler):
+    for number in range(120):
+        storage.put(REMINDERS, reminder(f'r{number:03d}'))
+    scheduler.start()
+    wait_for(lambda: scheduler.stats()['active_reminders'] == 120)
+
+    storage.delete(REMINDERS, 'r007')
+    make_due_now(scheduler, count=120)
+    wait_for(lambda: scheduler.stats()['fired'] + scheduler.stats()['skipped_inactive'] == 120)
+
+    assert sorted(scheduler.fired) == [f'r{number:03d}' for number in range(120) if number != 7]
+    assert [len(ids) for ids in scheduler.lookups] == [50, 50, 20]
+
+
+def test_routes_log_reminder_changes(client, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(medtrack.reminder_changes, 'record', recorded.append)
+    register(client, 'pat@example.com', 'patient')
+    login(client, 'pat@example.com')
+    client.post('/add_medication_reminder', data={
+        'medication': 'Aspirin', 'dosage': '1 tablet', 'frequency': 'once_daily',
+        'times[]': ['08:00'], 'start_date': '2030-01-01',
+    })
+    (reminder_id,) = recorded
+    client.get(f'/delete_reminder/{reminder_id}')
+    assert recorded == [reminder_id, reminder_id]
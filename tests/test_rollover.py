@@ -0,0 +1,93 @@
+import pytest
+from botocore.exceptions import ClientError
+
+import app as medtrack
+
+REMINDERS = medtrack.MEDICATION_REMINDERS_TABLE
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def local_storage(request, tmp_path, monkeypatch):
+    if request.param == 'memory':
+        storage = medtrack.MemoryStorage()
+    else:
+        storage = medtrack.SQLiteStorage(str(tmp_path / 'medtrack.db'))
+    monkeypatch.setattr(medtrack, 'storage', storage)
+    return storage
+
+
+def daily_reminder(**fields):
+    reminder = {
+        'reminder_id': 'r1', 'patient_email': 'pat@example.com', 'medication': 'Aspirin',
+        'frequency': 'once_daily', 'status': 'Taken', 'taken_today': True, 'last_checked_date': '2030-01-01',
+    }
+    reminder.update(fields)
+    return reminder
+
+
+def test_rollover_resets_daily_reminders(local_storage):
+    local_storage.put(REMINDERS, daily_reminder(notes='keep me'))
+
+    report = medtrack.rollover_reminders(today='2030-01-02')
+
+    assert (report['updated'], report['skipped']) == (1, 0)
+    assert local_storage.get(REMINDERS, 'r1') == daily_reminder(
+        notes='keep me', status='Pending', taken_today=False, last_checked_date='2030-01-02'
+    )
+
+
+def test_rollover_does_not_resurrect_deleted_reminders(local_storage):
+    local_storage.put(REMINDERS, daily_reminder())
+    scanned = local_storage.get(REMINDERS, 'r1')
+    local_storage.delete(REMINDERS, 'r1')
+
+    assert not local_storage.update_if(REMINDERS, 'r1', *medtrack.rollover_update(scanned, '2030-01-02'))
+    assert local_storage.get(REMINDERS, 'r1') is None
+
+
+def test_rollover_keeps_a_dose_marked_after_the_scan(local_storage):
+    local_storage.put(REMINDERS, daily_reminder())
+    scanned = local_storage.get(REMINDERS, 'r1')
+    # The patient marks today's dose: the route rolls the reminder over itself first.
+    local_storage.update(REMINDERS, 'r1', {'last_checked_date': '2030-01-02', 'status': 'Taken', 'taken_today': True})
+
+    assert not local_storage.update_if(REMINDERS, 'r1', *medtrack.rollover_update(scanned, '2030-01-02'))
+    assert local_storage.get(REMINDERS, 'r1')['status'] == 'Taken'
+
+
+def test_rollover_marks_missed_only_while_pending(local_storage):
+    local_storage.put(REMINDERS, daily_reminder(frequency='once', date='2030-01-01', status='Pending'))
+    scanned = local_storage.get(REMINDERS, 'r1')
+    local_storage.update(REMINDERS, 'r1', {'status': 'Taken'})
+
+    assert not local_storage.update_if(REMINDERS, 'r1', *medtrack.rollover_update(scanned, '2030-01-02'))
+    assert local_storage.get(REMINDERS, 'r1')['status'] == 'Taken'
+
+
+class RecordingTable:
+    def __init__(self, error_code=None):
+        self.calls = []
+        self.error_code = error_code
+
+    def update_item(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error_code:
+            raise ClientError({'Error': {'Code': self.error_code}}, 'UpdateItem')
+
+
+def test_dynamodb_rollover_writes_only_changed_attributes_conditionally():
+    table = RecordingTable()
+    storage = medtrack.DynamoDBStorage({REMINDERS: table})
+
+    changes, equals, not_equals = medtrack.rollover_update(daily_reminder(), '2030-01-02')
+    assert storage.update_if(REMINDERS, 'r1', changes, equals, not_equals)
+
+    (call,) = table.calls
+    assert set(call['ExpressionAttributeNames'].values()) == {'reminder_id', 'status', 'taken_today', 'last_checked_date'}
+    assert call['ConditionExpression'] == 'attribute_exists(#key) AND (attribute_not_exists(#n0) OR #n0 <> :n0)'
+    assert call['ExpressionAttributeValues'][':n0'] == '2030-01-02'
+
+
+def test_dynamodb_update_if_reports_a_failed_condition():
+    storage = medtrack.DynamoDBStorage({REMINDERS: RecordingTable('ConditionalCheckFailedException')})
+    assert not storage.update_if(REMINDERS, 'r1', {'status': 'Missed'}, equals={'status': 'Pending'})
@@ -0,0 +1,36 @@
+import app as medtrack
+from conftest import login, register
+
+
+def test_login_issues_a_new_session_id(storage, monkeypatch):
+    monkeypatch.setattr(medtrack.app, 'session_interface', medtrack.create_session_interface('memory'))
+    cookie_name = medtrack.app.config['SESSION_COOKIE_NAME']
+    attacker = medtrack.app.test_client()
+    victim = medtrack.app.test_client()
+    register(victim, 'pat@example.com', 'patient')
+
+    # The attacker gets a session id while logged out and plants it in the victim's browser.
+    attacker.get('/patient_dashboard')
+    planted = attacker.get_cookie(cookie_name).value
+    victim.set_cookie(cookie_name, planted)
+    login(victim, 'pat@example.com')
+
+    assert victim.get_cookie(cookie_name).value != planted
+    assert victim.get('/patient_dashboard').status_code == 200
+    assert attacker.get('/patient_dashboard').status_code == 302
+
+
+def test_logout_retires_the_session_id(storage, monkeypatch):
+    monkeypatch.setattr(medtrack.app, 'session_interface', medtrack.create_session_interface('memory'))
+    cookie_name = medtrack.app.config['SESSION_COOKIE_NAME']
+    client = medtrack.app.test_client()
+    register(client, 'pat@example.com', 'patient')
+    login(client, 'pat@example.com')
+    logged_in = client.get_cookie(cookie_name).value
+
+    client.get('/logout')
+
+    assert client.get_cookie(cookie_name).value != logged_in
+    replay = medtrack.app.test_client()
+    replay.set_cookie(cookie_name, logged_in)
+    assert replay.get('/patient_dashboard').status_code == 302
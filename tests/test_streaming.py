@@ -0,0 +1,29 @@
+import app as medtrack
+from conftest import login, register
+
+
+def test_mid_stream_failure_ends_page_with_error_fragment(client, storage, monkeypatch):
+    register(client, 'pat@example.com', 'patient')
+    login(client, 'pat@example.com')
+    storage.put(medtrack.APPOINTMENTS_TABLE, {
+        'appointment_id': 'apt-1', 'patient_email': 'pat@example.com', 'doctor_email': 'doc@example.com',
+        'doctor_name': 'First Row', 'date': '2030-01-01', 'status': 'Pending',
+    })
+    template, load = medtrack.PATIENT_FRAGMENTS['appointments']
+
+    def failing_load(email):
+        context = load(email)
+        rows = list(context['appointments'])
+
+        def read():
+            yield from rows
+            raise ConnectionError('connection reset while paging')
+        context['appointments'] = medtrack.LazyRows(read())
+        return context
+
+    monkeypatch.setitem(medtrack.PATIENT_FRAGMENTS, 'appointments', (template, failing_load))
+    response = client.get('/patient_dashboard/appointments')
+
+    body = response.get_data(as_text=True)
+    assert 'First Row' in body
+    assert 'This section could not be loaded' in body
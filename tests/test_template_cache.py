@@ -0,0 +1,24 @@
+import os
+import stat
+
+import pytest
+
+import app as medtrack
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX permissions')
+
+
+def test_bytecode_cache_dir_must_be_private(tmp_path):
+    created = tmp_path / 'created'
+    assert medtrack.private_cache_dir(str(created))
+    assert stat.S_IMODE(created.stat().st_mode) == 0o700
+
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    shared.chmod(0o777)
+    assert not medtrack.private_cache_dir(str(shared))
+
+
+def test_default_bytecode_cache_uses_jinja_per_user_directory():
+    cache = medtrack.app.jinja_env.bytecode_cache
+    assert os.path.basename(cache.directory).startswith('_jinja2-cache')